@@ -0,0 +1,85 @@
+"""Convert ISO-string timestamps to native BSON dates.
+
+Older documents were written with ``datetime.isoformat()`` strings. Each run
+only selects documents whose field is still a string, so the command can be
+interrupted and re-run safely until it reports nothing left to convert.
+
+    python migrate_timestamps.py [--batch-size 500] [--dry-run]
+"""
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pathlib import Path
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import logging
+import os
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+TIMESTAMP_FIELDS = {
+    "vehicles": ["created_at", "updated_at"],
+    "contact_messages": ["created_at"],
+    "status_checks": ["timestamp"],
+}
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("migrate_timestamps")
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_field(collection, field: str, batch_size: int, dry_run: bool) -> int:
+    query = {field: {"$type": "string"}}
+    if dry_run:
+        return await collection.count_documents(query)
+    converted = 0
+    skipped = []
+    while True:
+        docs = await collection.find({**query, "_id": {"$nin": skipped}}, {"_id": 1, field: 1}).limit(
+            batch_size
+        ).to_list(batch_size)
+        if not docs:
+            return converted
+        ops = []
+        for doc in docs:
+            try:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: parse_timestamp(doc[field])}}))
+            except ValueError:
+                logger.warning(f"{collection.name}.{field}: unparseable value {doc[field]!r} on {doc['_id']}")
+                skipped.append(doc["_id"])
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            converted += len(ops)
+            logger.info(f"{collection.name}.{field}: converted {converted} so far")
+
+
+async def main(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    try:
+        for collection_name, fields in TIMESTAMP_FIELDS.items():
+            for field in fields:
+                count = await migrate_field(db[collection_name], field, batch_size, dry_run)
+                verb = "would convert" if dry_run else "converted"
+                logger.info(f"{collection_name}.{field}: {verb} {count} documents")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents that need converting")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
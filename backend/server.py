@@ -1,18 +1,47 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File, Request, Response, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo import monitoring
 import os
 import logging
 import asyncio
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError, field_validator
+from typing import Dict, List, Optional
+import threading
 import uuid
 from datetime import datetime, timezone
 import hashlib
+import hmac
+import math
+import secrets
+import time
+import json
+import base64
+import codecs
+import csv
+import io
+import re
+import html
+from datetime import timedelta
+import mimetypes
+import multiprocessing
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from email.utils import formatdate, parsedate_to_datetime
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 import aiofiles
+import brotli
+import gzip
+# Used by ORJSONResponse; imported here so a missing install fails at startup
+import orjson  # noqa: F401
+from PIL import Image, ImageOps, UnidentifiedImageError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -21,137 +50,2676 @@ load_dotenv(ROOT_DIR / '.env')
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
 
-# MongoDB connection
+# Uploads are streamed here before processing, outside the served directory
+UPLOADS_TMP_DIR = ROOT_DIR / 'uploads_tmp'
+UPLOADS_TMP_DIR.mkdir(exist_ok=True)
+
+# Prebuilt catalog, SEO fragments and sitemap, regenerated after inventory writes
+STATIC_DIR = ROOT_DIR / 'static'
+STATIC_DIR.mkdir(exist_ok=True)
+
+# Metrics, exposed on /metrics in the Prometheus text format
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+METRICS: list = []
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Metrics are also updated from pymongo's monitoring threads, hence the locks
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: Dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            # Counts are stored per bucket and made cumulative when rendered
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            # Copies, so each series' buckets, sum and count are consistent
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in snapshot:
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                total += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {total}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+http_requests_total = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_response_bytes = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), buckets=SIZE_BUCKETS
+)
+mongo_command_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+)
+email_contacts_total = Counter("email_contacts_total", "Contacts per email delivery attempt", ("outcome",))
+upload_bytes_total = Counter("upload_bytes_total", "Bytes received through image uploads")
+uploads_total = Counter("uploads_total", "Image uploads", ("result",))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name."""
+
+    def __init__(self):
+        self._collections: Dict[int, str] = {}  # request_id -> collection
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def _finish(self, event, outcome: str):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class MetricsMiddleware:
+    """Records count, latency and body size per route template.
+
+    Plain ASGI rather than @app.middleware so streamed and file responses are
+    measured without wrapping them. Unmatched paths share one "unmatched"
+    label to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        declared_size = None
+        streamed_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, declared_size, streamed_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        declared_size = int(value)
+            elif message["type"] == "http.response.body":
+                streamed_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            http_requests_total.inc(*labels, status)
+            http_request_seconds.observe(time.perf_counter() - start, *labels)
+            http_response_bytes.observe(streamed_size if declared_size is None else declared_size, *labels)
+
+
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters reported by /api/ready."""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        return {
+            "open": self.open,
+            "in_use": self.checked_out,
+            "max_size": MONGO_MAX_POOL_SIZE,
+            "min_size": MONGO_MIN_POOL_SIZE,
+            "checkout_failures": self.checkout_failures,
+            "pool_clears": self.pool_clears,
+        }
+
+
+# MongoDB connection. The client is created and warmed up in lifespan();
+# the timeouts make a slow or unreachable database fail requests quickly
+# instead of letting them queue up.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '5'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '3000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '3000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+# How long a request waits for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+mongo_pool_stats = MongoPoolStats()
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        mongo_url,
+        # tz_aware so stored UTC datetimes come back comparable with datetime.now(timezone.utc)
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[MongoCommandMetrics(), mongo_pool_stats],
+    )
+
+# Resend configuration
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
+RECIPIENT_EMAIL = os.environ.get('RECIPIENT_EMAIL', 'alan.can85@gmail.com')
+
+# Contact notification outbox. EMAIL_SENDER is 'resend' (default when
+# RESEND_API_KEY is set) or 'fake' to record emails in memory for testing.
+EMAIL_SENDER = os.environ.get('EMAIL_SENDER', 'resend' if RESEND_API_KEY else '')
+EMAIL_CONCURRENCY = int(os.environ.get('EMAIL_CONCURRENCY', '2'))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '8'))
+EMAIL_RETRY_BASE = float(os.environ.get('EMAIL_RETRY_BASE', '30'))
+EMAIL_RETRY_MAX = float(os.environ.get('EMAIL_RETRY_MAX', '3600'))
+EMAIL_POLL_INTERVAL = float(os.environ.get('EMAIL_POLL_INTERVAL', '5'))
+# How long a claimed entry stays reserved before another worker may retry it
+EMAIL_SEND_LEASE = 120
+# Digest mode: when > 0, wait up to this many seconds and send one email per batch
+EMAIL_DIGEST_INTERVAL = float(os.environ.get('EMAIL_DIGEST_INTERVAL', '0'))
+EMAIL_DIGEST_MAX = int(os.environ.get('EMAIL_DIGEST_MAX', '50'))
+
+# Admin password (hashed)
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'jrautos2024')
+
+# Admin session tokens: lifetime in seconds, and the HMAC key that signs them.
+# Without ADMIN_TOKEN_SECRET the key is derived from the password, so changing
+# the password also invalidates every issued token.
+ADMIN_TOKEN_TTL = int(os.environ.get('ADMIN_TOKEN_TTL', str(12 * 3600)))
+ADMIN_TOKEN_KEY = hashlib.pbkdf2_hmac(
+    'sha256', os.environ.get('ADMIN_TOKEN_SECRET', ADMIN_PASSWORD).encode(), b'jrautos-admin-token', 100_000
+)
+
+# Public inventory cache - seconds before a snapshot is reloaded from MongoDB
+INVENTORY_CACHE_TTL = float(os.environ.get('INVENTORY_CACHE_TTL', '300'))
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=60')
+# After a failed background reload, seconds before the next attempt
+INVENTORY_RETRY_INTERVAL = 5
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
+# Largest page a client may request with ?limit=
+MAX_PAGE_SIZE = 100
+# Contact messages per page when the admin does not ask for a size
+CONTACTS_PAGE_SIZE = 50
+
+# Image variants generated for every upload: name -> max width in pixels
+IMAGE_VARIANTS = {"thumb": 320, "card": 640, "detail": 1280, "full": 1920}
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', '80'))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+
+# Upload size cap and streaming chunk size, in bytes
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Unreferenced upload files younger than this (seconds) are left alone by the
+# garbage collector, so a just-uploaded image is safe until its vehicle is saved
+UPLOAD_GC_GRACE = 600
+# Seconds between sweeps for uploads no vehicle references (abandoned forms,
+# files that were still within the grace period when their vehicle changed)
+UPLOAD_SWEEP_INTERVAL = float(os.environ.get('UPLOAD_SWEEP_INTERVAL', '3600'))
+
+# Uploads serving: cache policy and the in-memory LRU for small hot files
+UPLOADS_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UPLOADS_CACHE_CONTROL = os.environ.get('UPLOADS_CACHE_CONTROL', 'public, max-age=86400')
+UPLOADS_MEMORY_CACHE_BYTES = int(os.environ.get('UPLOADS_MEMORY_CACHE_BYTES', str(32 * 1024 * 1024)))
+UPLOADS_MEMORY_CACHE_MAX_FILE = 256 * 1024
+
+# Static artifacts: public site URL used in sitemap/OpenGraph links, seconds
+# of quiet after an inventory write before rebuilding, and their cache policy.
+# Clients may show a stale copy while revalidating, so keep max-age short.
+SITE_URL = os.environ.get('SITE_URL', 'https://jrautos.com').rstrip('/')
+SITE_PAGES = ("/", "/inventory", "/services", "/about", "/contact")
+STATIC_BUILD_DELAY = float(os.environ.get('STATIC_BUILD_DELAY', '5'))
+STATIC_CACHE_CONTROL = os.environ.get('STATIC_CACHE_CONTROL', 'public, max-age=300, stale-while-revalidate=604800')
+# Built SPA entry point; /vehicle/{id} serves it with the vehicle's fragment
+# in <head>, for crawlers and link previews that do not run JavaScript
+SPA_INDEX_HTML = Path(os.environ.get('SPA_INDEX_HTML', str(ROOT_DIR.parent / 'frontend' / 'build' / 'index.html')))
+
+# Live change feed (/api/vehicles/events): events kept for Last-Event-ID
+# resume, events buffered per subscriber before it is reset, and seconds
+# between keep-alive comments
+EVENTS_HISTORY = int(os.environ.get('EVENTS_HISTORY', '1000'))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', '100'))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', '15'))
+# Streams never end on their own and uvicorn waits for open responses before
+# the lifespan shutdown: run it with --timeout-graceful-shutdown (or
+# UVICORN_TIMEOUT_GRACEFUL_SHUTDOWN) so a shutdown cancels them after that
+# Lifetime in seconds of the admin stream token passed as ?token=; it only
+# has to be valid when the stream is opened
+EVENTS_TOKEN_TTL = int(os.environ.get('EVENTS_TOKEN_TTL', '60'))
+# Also follow MongoDB change streams (replica set required), so writes made
+# by other workers reach this worker's subscribers and inventory cache
+EVENTS_CHANGE_STREAMS = os.environ.get('EVENTS_CHANGE_STREAMS', '').lower() in ('1', 'true', 'yes')
+# Vehicle changes from the stream are applied once none arrived for this
+# many seconds; a burst of more than EVENTS_CHANGE_BURST (a bulk import on
+# another worker) is one cache reload and a reset instead of an event each
+EVENTS_CHANGE_WINDOW = float(os.environ.get('EVENTS_CHANGE_WINDOW', '0.2'))
+EVENTS_CHANGE_BURST = int(os.environ.get('EVENTS_CHANGE_BURST', '20'))
+
+# Contact retention: replied messages move to contact_messages_archive this
+# many days after being marked replied, and any message after
+# CONTACT_RETENTION_DAYS. Archived messages are deleted after
+# CONTACT_ARCHIVE_TTL_DAYS (0 keeps them forever).
+CONTACT_STATUSES = ("new", "read", "replied")
+CONTACT_ARCHIVE_REPLIED_DAYS = int(os.environ.get('CONTACT_ARCHIVE_REPLIED_DAYS', '30'))
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', '365'))
+CONTACT_ARCHIVE_TTL_DAYS = int(os.environ.get('CONTACT_ARCHIVE_TTL_DAYS', '0'))
+# Seconds between archival runs
+CONTACT_ARCHIVE_INTERVAL = float(os.environ.get('CONTACT_ARCHIVE_INTERVAL', '3600'))
+
+# Status heartbeats: buffered pings are written once this many are queued or
+# every STATUS_FLUSH_INTERVAL seconds; raw pings and per-minute rollups expire
+# after the given number of seconds
+STATUS_FLUSH_SIZE = int(os.environ.get('STATUS_FLUSH_SIZE', '500'))
+STATUS_FLUSH_INTERVAL = float(os.environ.get('STATUS_FLUSH_INTERVAL', '2'))
+STATUS_MAX_BUFFER = 20 * STATUS_FLUSH_SIZE
+STATUS_RAW_TTL = int(os.environ.get('STATUS_RAW_TTL', str(7 * 86400)))
+STATUS_ROLLUP_TTL = int(os.environ.get('STATUS_ROLLUP_TTL', str(90 * 86400)))
+# Widest time range GET /api/status will aggregate
+STATUS_MAX_RANGE = timedelta(days=31)
+
+# Bulk import/export: documents per insert_many/bulk_write call or cursor batch
+BULK_BATCH_SIZE = 500
+MAX_REPORTED_ROW_ERRORS = 1000
+
+# Per-client rate limits as "<requests>/<seconds>": a client may burst up to
+# <requests> and then regains that allowance gradually over <seconds>
+CONTACT_RATE_LIMIT = os.environ.get('CONTACT_RATE_LIMIT', '5/600')
+ADMIN_LOGIN_RATE_LIMIT = os.environ.get('ADMIN_LOGIN_RATE_LIMIT', '10/300')
+# Most client buckets held in memory; the least recently seen are dropped first
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+# Take the client IP from X-Forwarded-For (only behind a trusted proxy).
+# TRUSTED_PROXY_HOPS is how many proxies append to the header; the client
+# is the entry that many places from the right, since anything further left
+# was sent by the client itself.
+TRUST_PROXY_HEADERS = os.environ.get('TRUST_PROXY_HEADERS', '').lower() in ('1', 'true', 'yes')
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '1')) if TRUST_PROXY_HEADERS else 0
+
+# Indexes ensured at startup, per collection
+MONGO_INDEXES = {
+    "vehicles": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Public catalog: {"available": True} sorted newest first, keyset on id
+        IndexModel([("available", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="available_created_at_id"),
+        # Admin list: every vehicle sorted by created_at
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "contact_messages": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+    ],
+    "contact_messages_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ] + ([IndexModel([("archived_at", ASCENDING)], name="archived_at_ttl",
+                     expireAfterSeconds=CONTACT_ARCHIVE_TTL_DAYS * 86400)] if CONTACT_ARCHIVE_TTL_DAYS else []),
+    "email_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+    ],
+    "status_checks": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Raw pings are only kept for STATUS_RAW_TTL; queries use status_rollups
+        IndexModel([("timestamp", ASCENDING)], name="timestamp_ttl", expireAfterSeconds=STATUS_RAW_TTL),
+    ],
+    "status_rollups": [
+        IndexModel([("client_name", ASCENDING), ("minute", ASCENDING)], name="client_minute_unique", unique=True),
+        IndexModel([("minute", ASCENDING)], name="minute_ttl", expireAfterSeconds=STATUS_ROLLUP_TTL),
+    ],
+}
+
+# Result of the last ensure_indexes() run, reported on /api/health
+index_state: dict = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, _image_pool
+    # A client assigned before startup (e.g. a mock in the benchmark) is kept
+    if client is None:
+        client = create_mongo_client()
+        db = client[os.environ['DB_NAME']]
+    await asyncio.gather(warm_up(), warm_up_image_pool())
+    email_outbox.start()
+    status_writer.start()
+    contact_archiver.start()
+    upload_sweeper.start()
+    static_site.schedule()
+    change_watcher = asyncio.create_task(watch_changes()) if EVENTS_CHANGE_STREAMS else None
+    event_broker.closed = False
+    try:
+        yield
+    finally:
+        event_broker.close()
+        if change_watcher is not None:
+            change_watcher.cancel()
+        await vehicle_changes.stop()
+        await email_outbox.stop()
+        await status_writer.stop()
+        await contact_archiver.stop()
+        await upload_sweeper.stop()
+        await static_site.stop()
+        client.close()
+        if _image_pool is not None:
+            _image_pool.shutdown()
+            _image_pool = None
+
+
+# Create the main app without a prefix
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Create a router with the /api prefix
+api_router = APIRouter(prefix="/api")
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def mongo_time(value: datetime) -> datetime:
+    """Truncate to the millisecond precision BSON dates keep."""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def utc_now() -> datetime:
+    # Cached copies of a document then match what MongoDB hands back
+    return mongo_time(datetime.now(timezone.utc))
+
+
+# Define Models
+class StatusCheck(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class StatusCheckCreate(BaseModel):
+    client_name: str
+
+class ContactStatusUpdate(BaseModel):
+    status: str = Field(pattern="^(new|read|replied)$")
+
+class StatusRollup(BaseModel):
+    client_name: str
+    start: datetime
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+
+class ContactMessage(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: EmailStr
+    phone: Optional[str] = None
+    message: str
+    # new -> read -> replied; messages stored before statuses existed are new
+    status: str = "new"
+    status_updated_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ContactMessageCreate(BaseModel):
+    name: str
+    email: EmailStr
+    phone: Optional[str] = None
+    message: str
+
+# Vehicle Models
+class VehicleImage(BaseModel):
+    url: str
+    order: int = 0
+
+class Vehicle(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    year: str
+    brand: str
+    bodyType: str
+    engine: str
+    fuel: str
+    transmission: str
+    description_es: str
+    description_en: str
+    images: List[str] = []
+    cover_image: str = ""
+    available: bool = True
+    # Bumped on every update; used for optimistic concurrency (If-Match / version)
+    version: int = 0
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
+
+    @field_validator('created_at', 'updated_at')
+    @classmethod
+    def _stored_precision(cls, value: datetime) -> datetime:
+        return mongo_time(value)
+
+class VehicleCreate(BaseModel):
+    name: str
+    year: str
+    brand: str
+    bodyType: str
+    engine: str
+    fuel: str
+    transmission: str
+    description_es: str
+    description_en: str
+    images: List[str] = []
+    cover_image: str = ""
+
+class VehicleUpdate(BaseModel):
+    name: Optional[str] = None
+    year: Optional[str] = None
+    brand: Optional[str] = None
+    bodyType: Optional[str] = None
+    engine: Optional[str] = None
+    fuel: Optional[str] = None
+    transmission: Optional[str] = None
+    description_es: Optional[str] = None
+    description_en: Optional[str] = None
+    images: Optional[List[str]] = None
+    cover_image: Optional[str] = None
+    available: Optional[bool] = None
+    # Expected current version; the update is rejected with 409 if it changed
+    version: Optional[int] = None
+
+class VehicleSearchResult(BaseModel):
+    total: int
+    results: List[Vehicle]
+    facets: Dict[str, Dict[str, int]]
+
+class AdminLogin(BaseModel):
+    password: str
+
+class AdminToken(BaseModel):
+    token: str
+    message: str
+    expires_at: datetime
+
+
+# Filtering and keyset pagination
+VEHICLE_FILTER_FIELDS = ('brand', 'bodyType', 'fuel', 'transmission')
+
+# sort key -> (field, direction); ties are broken by id in the same direction
+VEHICLE_SORTS = {
+    "newest": ("created_at", -1),
+    "oldest": ("created_at", 1),
+    "year_desc": ("year", -1),
+    "year_asc": ("year", 1),
+    "name": ("name", 1),
+}
+
+
+def encode_cursor(value, item_id: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, item_id]).encode()).decode()
+
+
+# Sort fields stored as BSON dates; their cursor values are ISO strings
+DATETIME_SORT_FIELDS = ('created_at', 'updated_at', 'timestamp')
+
+
+def decode_cursor(cursor: str, field: str) -> tuple:
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = datetime.fromisoformat(value) if field in DATETIME_SORT_FIELDS else str(value)
+        return value, str(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, direction: int, value, item_id: str) -> dict:
+    """Mongo filter selecting documents strictly after (value, item_id) in sort order."""
+    op = '$lt' if direction < 0 else '$gt'
+    return {'$or': [{field: {op: value}}, {field: value, 'id': {op: item_id}}]}
+
+
+async def find_page(collection, query: dict, sort_field: str, direction: int,
+                    limit: Optional[int], cursor: Optional[str]) -> tuple:
+    """Fetch one page from a collection; returns (docs, next_cursor)."""
+    if cursor:
+        query = {'$and': [query, keyset_filter(sort_field, direction, *decode_cursor(cursor, sort_field))]}
+    docs = await collection.find(query, {"_id": 0}).sort([(sort_field, direction), ("id", direction)]).to_list(
+        limit + 1 if limit else None
+    )
+    next_cursor = None
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1][sort_field], docs[-1]['id'])
+    return docs, next_cursor
+
+
+class VehicleQuery(BaseModel):
+    brand: Optional[str] = None
+    bodyType: Optional[str] = None
+    fuel: Optional[str] = None
+    transmission: Optional[str] = None
+    year_min: Optional[str] = None
+    year_max: Optional[str] = None
+    sort: str = "newest"
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+
+    def mongo_filter(self) -> dict:
+        query = {f: getattr(self, f) for f in VEHICLE_FILTER_FIELDS if getattr(self, f)}
+        year = {}
+        if self.year_min:
+            year['$gte'] = self.year_min
+        if self.year_max:
+            year['$lte'] = self.year_max
+        if year:
+            query['year'] = year
+        return query
+
+    def matches(self, vehicle: dict) -> bool:
+        for f in VEHICLE_FILTER_FIELDS:
+            value = getattr(self, f)
+            if value and vehicle.get(f) != value:
+                return False
+        if self.year_min and vehicle.get('year', '') < self.year_min:
+            return False
+        if self.year_max and vehicle.get('year', '') > self.year_max:
+            return False
+        return True
+
+    def paginate(self, vehicles: List[dict]) -> tuple:
+        """Filter, sort and page an in-memory list; returns (page, next_cursor, total)."""
+        field, direction = VEHICLE_SORTS[self.sort]
+        items = [v for v in vehicles if self.matches(v)]
+        if self.sort != "newest":
+            items.sort(key=lambda v: (v[field], v['id']), reverse=direction < 0)
+        total = len(items)
+        if self.cursor:
+            after = decode_cursor(self.cursor, field)
+            items = [v for v in items if ((v[field], v['id']) < after if direction < 0 else (v[field], v['id']) > after)]
+        next_cursor = None
+        if self.limit and len(items) > self.limit:
+            items = items[:self.limit]
+            next_cursor = encode_cursor(items[-1][field], items[-1]['id'])
+        return items, next_cursor, total
+
+
+def vehicle_query(
+    brand: Optional[str] = None,
+    bodyType: Optional[str] = None,
+    fuel: Optional[str] = None,
+    transmission: Optional[str] = None,
+    year_min: Optional[str] = None,
+    year_max: Optional[str] = None,
+    sort: str = "newest",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> VehicleQuery:
+    if sort not in VEHICLE_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(VEHICLE_SORTS)}")
+    return VehicleQuery(brand=brand, bodyType=bodyType, fuel=fuel, transmission=transmission,
+                        year_min=year_min, year_max=year_max, sort=sort, limit=limit, cursor=cursor)
+
+
+# Named field sets for ?view=; None means every field
+VEHICLE_VIEWS = {
+    "card": ("id", "name", "brand", "year", "bodyType", "engine", "fuel", "transmission", "cover_image"),
+    "detail": None,
+}
+VEHICLE_LANGUAGES = ("es", "en")
+
+
+def vehicle_projection(
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
+    lang: Optional[str] = None,
+) -> Optional[tuple]:
+    """Fields to include in a public vehicle response, in model order; None for all.
+
+    fields= (comma separated) takes precedence over view=; lang= drops the
+    other language's description. The id is always included.
+    """
+    if view is not None and view not in VEHICLE_VIEWS:
+        raise HTTPException(status_code=400, detail=f"Invalid view. Use one of: {', '.join(VEHICLE_VIEWS)}")
+    if lang is not None and lang not in VEHICLE_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Invalid lang. Use one of: {', '.join(VEHICLE_LANGUAGES)}")
+    if fields:
+        selected = {f.strip() for f in fields.split(',') if f.strip()}
+        unknown = selected - Vehicle.model_fields.keys()
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        selected = set(VEHICLE_VIEWS[view] or Vehicle.model_fields) if view else set(Vehicle.model_fields)
+    if lang:
+        selected -= {f"description_{other}" for other in VEHICLE_LANGUAGES if other != lang}
+    selected.add("id")
+    if selected == Vehicle.model_fields.keys():
+        return None
+    return tuple(f for f in Vehicle.model_fields if f in selected)
+
+
+def project_vehicle(vehicle: dict, projection: Optional[tuple]) -> dict:
+    if projection is None:
+        return vehicle
+    projected = {f: vehicle[f] for f in projection if f in vehicle}
+    # Cards show the first photo when no cover was picked
+    if "cover_image" in projected and not projected["cover_image"] and vehicle.get("images"):
+        projected["cover_image"] = vehicle["images"][0]
+    return projected
+
+
+CARD_PROJECTION = vehicle_projection(view="card")
+
+
+def page_headers(next_cursor: Optional[str], total: Optional[int] = None) -> dict:
+    headers = {}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    if total is not None:
+        headers['X-Total-Count'] = str(total)
+    return headers
+
+
+# Inventory search
+SEARCH_FIELD_WEIGHTS = {"name": 3, "brand": 3, "engine": 1, "description_es": 1, "description_en": 1}
+SEARCH_FACET_FIELDS = ('brand', 'bodyType', 'fuel', 'transmission', 'year')
+SEARCH_STOPWORDS = frozenset({
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'los', 'para', 'por', 'un', 'una', 'y',
+    'an', 'and', 'for', 'in', 'is', 'of', 'the', 'to', 'with',
+})
+# Most index terms a single query word may expand to by prefix
+SEARCH_MAX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents (ñ -> n, é -> e) and split into words."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return [token for token in re.findall(r'[a-z0-9]+', text) if token not in SEARCH_STOPWORDS]
+
+
+def iter_bits(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class SearchIndex:
+    """Inverted index and facet bitsets over the available inventory.
+
+    Every vehicle owns a slot; postings and facet values are Python ints used as
+    bitsets over slots, so filtering and facet counting are AND + bit_count.
+    """
+
+    def __init__(self):
+        self.build([])
+
+    def build(self, vehicles: List[dict]):
+        self._docs: List[Optional[dict]] = []
+        self._doc_terms: List[dict] = []
+        self._free: List[int] = []
+        self._slots: dict = {}
+        self._terms: dict = {}
+        self._sorted_terms: Optional[List[str]] = None
+        self._facets: dict = {field: {} for field in SEARCH_FACET_FIELDS}
+        self._all = 0
+        for vehicle in vehicles:
+            self.add(vehicle)
+
+    def add(self, vehicle: dict):
+        slot = self._free.pop() if self._free else len(self._docs)
+        if slot == len(self._docs):
+            self._docs.append(None)
+            self._doc_terms.append({})
+        bit = 1 << slot
+        terms = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(str(vehicle.get(field) or '')):
+                terms[token] = max(terms.get(token, 0), weight)
+        for token in terms:
+            if token not in self._terms:
+                self._terms[token] = 0
+                self._sorted_terms = None
+            self._terms[token] |= bit
+        for field in SEARCH_FACET_FIELDS:
+            values = self._facets[field]
+            value = str(vehicle.get(field) or '')
+            values[value] = values.get(value, 0) | bit
+        self._docs[slot] = vehicle
+        self._doc_terms[slot] = terms
+        self._slots[vehicle['id']] = slot
+        self._all |= bit
+
+    def remove(self, vehicle_id: str):
+        slot = self._slots.pop(vehicle_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        for token in self._doc_terms[slot]:
+            self._terms[token] &= mask
+            if not self._terms[token]:
+                del self._terms[token]
+                self._sorted_terms = None
+        for field in SEARCH_FACET_FIELDS:
+            values = self._facets[field]
+            value = str(self._docs[slot].get(field) or '')
+            values[value] &= mask
+            if not values[value]:
+                del values[value]
+        self._all &= mask
+        self._docs[slot] = None
+        self._doc_terms[slot] = {}
+        self._free.append(slot)
+
+    def upsert(self, vehicle: dict):
+        self.remove(vehicle['id'])
+        if vehicle.get('available', True):
+            self.add(vehicle)
+
+    def _expand(self, token: str) -> List[str]:
+        """Index terms starting with token, so partial words match while typing."""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._terms)
+        terms = self._sorted_terms
+        expansions = []
+        i = bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token) and len(expansions) < SEARCH_MAX_EXPANSIONS:
+            expansions.append(terms[i])
+            i += 1
+        return expansions
+
+    def query(self, text: str, filters: dict, limit: int, offset: int) -> tuple:
+        """Return (total, page of vehicles, facet counts).
+
+        Facet counts for a field apply every filter except that field's own, so
+        the UI can show how many results each alternative value would give.
+        """
+        text_bits = self._all
+        expansions = []
+        for token in tokenize(text):
+            words = self._expand(token)
+            bits = 0
+            for word in words:
+                bits |= self._terms[word]
+            text_bits &= bits
+            expansions.append(words)
+
+        filter_bits = {
+            field: self._facets[field].get(value, 0) for field, value in filters.items() if value
+        }
+        matched = text_bits
+        for bits in filter_bits.values():
+            matched &= bits
+
+        facets = {}
+        for field in SEARCH_FACET_FIELDS:
+            base = text_bits
+            for other, bits in filter_bits.items():
+                if other != field:
+                    base &= bits
+            facets[field] = {
+                value: count for value, bits in self._facets[field].items() if (count := (base & bits).bit_count())
+            }
+
+        def score(slot: int) -> int:
+            terms = self._doc_terms[slot]
+            return sum(max(terms.get(word, 0) for word in words) for words in expansions)
+
+        slots = sorted(
+            iter_bits(matched),
+            key=lambda slot: (score(slot), self._docs[slot]['created_at'], self._docs[slot]['id']),
+            reverse=True,
+        )
+        page = [self._docs[slot] for slot in slots[offset:offset + limit]]
+        return len(slots), page, facets
+
+
+# Inventory cache
+class InventoryCache:
+    """Versioned in-memory snapshot of the available inventory.
+
+    Admin write handlers patch the snapshot in place; the TTL only exists to
+    pick up edits made directly against the database. Once the TTL passes
+    the snapshot keeps being served while a single background task reloads
+    it (stale-while-revalidate). Only a missing or invalidated snapshot makes
+    readers wait, and concurrent readers then share one query.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._vehicles: List[dict] = []
+        self._by_id: dict = {}
+        self._bodies: OrderedDict = OrderedDict()  # cache key -> (body, etag, headers), LRU order
+        self.search = SearchIndex()
+        self._loaded_at: Optional[float] = None
+        self._writes = 0
+        self._refresh: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "coalesced": 0, "reloads": 0, "reload_errors": 0,
+                      "body_hits": 0, "body_misses": 0, "not_found": 0}
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _ensure_loaded(self):
+        if self._is_fresh():
+            self.stats["hits"] += 1
+            return
+        if self._loaded_at is not None:
+            # Past the TTL but still a consistent snapshot: serve it, refresh once
+            self.stats["stale"] += 1
+            self._start_refresh()
+            return
+        self.stats["coalesced" if self._refresh is not None else "misses"] += 1
+        # Shielded so a disconnecting client does not cancel everyone's reload
+        await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh is None:
+            self._refresh = asyncio.create_task(self._reload())
+        return self._refresh
+
+    async def _reload(self):
+        writes = self._writes
+        try:
+            vehicles = await db.vehicles.find({"available": True}, {"_id": 0}).sort(
+                [("created_at", -1), ("id", -1)]
+            ).to_list(None)
+        except Exception as e:
+            self.stats["reload_errors"] += 1
+            logger.error(f"Failed to reload inventory: {str(e)}")
+            if self._loaded_at is None:
+                raise
+            # Background refresh: keep serving the old snapshot and retry shortly
+            self._loaded_at = time.monotonic() - self.ttl + INVENTORY_RETRY_INTERVAL
+            return
+        finally:
+            self._refresh = None
+        self.stats["reloads"] += 1
+        self._set(vehicles)
+        self.search.build(vehicles)
+        # A write landed while we were reading - serve this snapshot but reload next time
+        self._loaded_at = time.monotonic() if writes == self._writes else None
+
+    def _set(self, vehicles: List[dict]):
+        self._vehicles = vehicles
+        self._by_id = {v['id']: v for v in self._vehicles}
+        self._bodies = OrderedDict()
+        self.version += 1
+
+    async def list(self) -> List[dict]:
+        await self._ensure_loaded()
+        return self._vehicles
+
+    async def get(self, vehicle_id: str) -> Optional[dict]:
+        await self._ensure_loaded()
+        return self._by_id.get(vehicle_id)
+
+    def _body(self, key, build) -> tuple:
+        # Serialized once per inventory version; dropped by _set(). Keys
+        # include client-chosen cursors, so the least recently used go first
+        cached = self._bodies.get(key)
+        self.stats["body_hits" if cached is not None else "body_misses"] += 1
+        if cached is not None:
+            self._bodies.move_to_end(key)
+            return cached
+        body, headers = build()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        cached = self._bodies[key] = (body, etag, headers)
+        if len(self._bodies) > MAX_CACHED_BODIES:
+            self._bodies.popitem(last=False)
+        return cached
+
+    async def list_body(self, query: VehicleQuery, projection: Optional[tuple] = None) -> tuple:
+        """Return (json_bytes, etag, headers) for one page of the catalog."""
+        await self._ensure_loaded()
+
+        def build():
+            page, next_cursor, total = query.paginate(self._vehicles)
+            body = _dump_json(_vehicle_list_adapter, page, projection)
+            return body, page_headers(next_cursor, total)
+
+        return self._body(('list', projection) + tuple(query.model_dump().values()), build)
+
+    async def search_vehicles(self, text: str, filters: dict, limit: int, offset: int) -> tuple:
+        await self._ensure_loaded()
+        return self.search.query(text, filters, limit, offset)
+
+    async def get_body(self, vehicle_id: str, projection: Optional[tuple] = None) -> Optional[tuple]:
+        """Return (json_bytes, etag, headers) for one vehicle, or None if not available."""
+        await self._ensure_loaded()
+        vehicle = self._by_id.get(vehicle_id)
+        if vehicle is None:
+            # Unknown ids are answered from the snapshot; they never reach MongoDB
+            self.stats["not_found"] += 1
+            return None
+        return self._body((vehicle_id, projection), lambda: (_dump_json(_vehicle_adapter, vehicle, projection), {}))
+
+    def upsert(self, vehicle: dict):
+        """Apply a created/updated vehicle to the snapshot."""
+        self._writes += 1
+        if self._loaded_at is None:
+            return
+        # As a reload would return it, so every worker serializes the same bytes
+        vehicle = Vehicle.model_validate(vehicle).model_dump()
+        vehicles = [v for v in self._vehicles if v['id'] != vehicle['id']]
+        if vehicle.get('available', True):
+            vehicles.append(vehicle)
+            vehicles.sort(key=lambda v: (v['created_at'], v['id']), reverse=True)
+        self._set(vehicles)
+        self.search.upsert(vehicle)
+
+    def remove(self, vehicle_id: str):
+        self._writes += 1
+        if self._loaded_at is None or vehicle_id not in self._by_id:
+            return
+        self._set([v for v in self._vehicles if v['id'] != vehicle_id])
+        self.search.remove(vehicle_id)
+
+    def invalidate(self):
+        self._writes += 1
+        self._loaded_at = None
+
+
+_vehicle_adapter = TypeAdapter(Vehicle)
+_vehicle_list_adapter = TypeAdapter(List[Vehicle])
+# Projected vehicles are partial, so they are dumped as plain dicts
+_projected_adapter = TypeAdapter(dict)
+_projected_list_adapter = TypeAdapter(List[dict])
+inventory_cache = InventoryCache(INVENTORY_CACHE_TTL)
+
+# Distinct filtered/paged bodies kept per inventory version (LRU)
+MAX_CACHED_BODIES = 512
+
+
+def _dump_json(adapter: TypeAdapter, value, projection: Optional[tuple] = None) -> bytes:
+    # Validate like response_model would, so extra DB fields are dropped
+    if projection is None:
+        return adapter.dump_json(adapter.validate_python(value))
+    # Only the projected fields are validated and written
+    if isinstance(value, list):
+        return _projected_list_adapter.dump_json([project_vehicle(v, projection) for v in value])
+    return _projected_adapter.dump_json(project_vehicle(value, projection))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison, so ignore a W/ prefix
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def cached_body_response(request: Request, body: bytes, etag: str, extra_headers: Optional[dict] = None,
+                         media_type: str = "application/json", cache_control: Optional[str] = None) -> Response:
+    """Send a prebuilt body (catalog JSON, static artifact), or 304 if the client already has it.
+
+    Compressed copies are cached by ETag, so each body is only compressed
+    once per encoding.
+    """
+    headers = {"Cache-Control": cache_control or CATALOG_CACHE_CONTROL, "Vary": "Accept-Encoding",
+               **(extra_headers or {})}
+    encoding = negotiate_encoding(request.headers.get('accept-encoding', '')) if len(body) >= COMPRESSION_MIN_SIZE else None
+    if encoding:
+        # Each encoding is its own representation with its own strong ETag
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        headers["Content-Encoding"] = encoding
+    else:
+        headers["ETag"] = etag
+    # Any encoding of the same body is still current for the client
+    if_none_match = request.headers.get('if-none-match')
+    if any(_etag_matches(if_none_match, tag) for tag in (etag, f'{etag[:-1]}-gzip"', f'{etag[:-1]}-br"')):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        body = compressed_bodies.get(etag, body, encoding)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# Response compression
+COMPRESSIBLE_TYPES = ("application/json", "application/xml", "application/javascript", "image/svg+xml")
+# Quality for bodies compressed once and cached vs per response
+CACHED_COMPRESSION_LEVEL = {"br": 9, "gzip": 9}
+DYNAMIC_COMPRESSION_LEVEL = {"br": 4, "gzip": 6}
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+    for coding in ("br", "gzip"):
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressedBodyCache:
+    """LRU of compressed catalog bodies keyed by (ETag, encoding)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, etag: str, body: bytes, encoding: str) -> bytes:
+        key = (etag, encoding)
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+        data = self._entries[key] = compress(body, encoding, CACHED_COMPRESSION_LEVEL[encoding])
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+
+compressed_bodies = CompressedBodyCache(2 * MAX_CACHED_BODIES)
+
+
+class CompressionMiddleware:
+    """Compresses complete text/JSON responses of at least COMPRESSION_MIN_SIZE.
+
+    Streaming responses (exports) and responses that already carry a
+    Content-Encoding, such as cached_body_response output, pass through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode('latin-1')
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                return await send(message)
+            start, start_message = start_message, None
+            if message["type"] == "http.response.body" and not message.get("more_body") and \
+                    self._compressible(start, message.get("body", b"")):
+                body = compress(message["body"], encoding, DYNAMIC_COMPRESSION_LEVEL[encoding])
+                headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary")]
+                vary = [v.decode('latin-1') for k, v in start["headers"] if k == b"vary"]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", ", ".join(vary + ["Accept-Encoding"]).encode('latin-1')),
+                ]
+                start = {**start, "headers": headers}
+                message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compressible(start: dict, body: bytes) -> bool:
+        if start["status"] != 200 or len(body) < COMPRESSION_MIN_SIZE:
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        content_type = content_type.split(b";")[0].decode('latin-1')
+        return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+# Admin authentication
+# Tokens are "<expiry unix time>.<token id>.<signature>", signed with ADMIN_TOKEN_KEY.
+# Event stream tokens carry their session's token id and are signed for the
+# "events" purpose, so neither kind is accepted in place of the other.
+# Logged-out token ids are kept until they would have expired anyway.
+revoked_admin_tokens: dict = {}  # token id -> expiry
+
+
+def _sign_admin_token(payload: str) -> str:
+    digest = hmac.new(ADMIN_TOKEN_KEY, payload.encode('utf-8', 'surrogateescape'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def issue_admin_token() -> tuple:
+    """Return (token, expiry datetime) for a new admin session."""
+    expires = int(time.time()) + ADMIN_TOKEN_TTL
+    payload = f"{expires}.{secrets.token_urlsafe(12)}"
+    return f"{payload}.{_sign_admin_token(payload)}", datetime.fromtimestamp(expires, timezone.utc)
+
+
+def issue_events_token(token_id: str, session_expires: int) -> tuple:
+    """Return (token, expiry datetime) for opening one admin event stream."""
+    expires = min(int(time.time()) + EVENTS_TOKEN_TTL, session_expires)
+    payload = f"{expires}.{token_id}"
+    return f"{payload}.{_sign_admin_token('events:' + payload)}", datetime.fromtimestamp(expires, timezone.utc)
+
+
+def decode_admin_token(token: str, purpose: str = "") -> Optional[tuple]:
+    """Return (token id, expiry) for a valid, unexpired, unrevoked token, else None."""
+    payload, _, signature = token.rpartition('.')
+    expected = _sign_admin_token(f"{purpose}:{payload}" if purpose else payload)
+    # compare_digest only accepts ASCII str, and tokens come from the client
+    if not hmac.compare_digest(signature.encode('utf-8', 'surrogateescape'), expected.encode()):
+        return None
+    expires, _, token_id = payload.partition('.')
+    if not expires.isdigit() or int(expires) <= time.time() or token_id in revoked_admin_tokens:
+        return None
+    return token_id, int(expires)
+
+
+def revoke_admin_token(token_id: str, expires: int):
+    now = time.time()
+    for expired in [tid for tid, exp in revoked_admin_tokens.items() if exp <= now]:
+        del revoked_admin_tokens[expired]
+    revoked_admin_tokens[token_id] = expires
+
+
+def admin_token_claims(authorization: str = Header(None)) -> tuple:
+    """Dependency returning (token id, expiry) of the caller's admin session."""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="No authorization header")
+    
+    try:
+        scheme, token = authorization.split()
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+    if scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Invalid authentication scheme")
+    
+    claims = decode_admin_token(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return claims
+
+
+def verify_admin_token(claims: tuple = Depends(admin_token_claims)):
+    return True
+
+
+async def ensure_indexes():
+    """Create any missing indexes in MONGO_INDEXES; safe to run on every startup."""
+    for collection_name, indexes in MONGO_INDEXES.items():
+        collection = db[collection_name]
+        try:
+            existing = set(await collection.index_information())
+            await collection.create_indexes(indexes)
+            names = [index.document['name'] for index in indexes]
+            created = [name for name in names if name not in existing]
+            if created:
+                logger.info(f"Created indexes on {collection_name}: {', '.join(created)}")
+            index_state[collection_name] = {"status": "ok", "indexes": names, "created": created}
+        except Exception as e:
+            logger.error(f"Failed to ensure indexes on {collection_name}: {str(e)}")
+            index_state[collection_name] = {"status": "error", "error": str(e)}
+
+
+# Rate limiting
+class MemoryRateLimitStore:
+    """Token buckets per key, kept in least-recently-seen order.
+
+    A bucket left idle long enough to refill completely is equivalent to no
+    bucket, so such entries are dropped as they age out; the store never holds
+    more than max_keys buckets. Another backend (e.g. Redis) only needs to
+    provide the same take() method.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()  # key -> (tokens, updated, full_after)
+
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        """Spend one token from key's bucket; return 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.pop(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_rate
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+        self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float):
+        # Oldest first: stop at the first bucket that has not refilled yet
+        while self._buckets:
+            key, (_, _, full_after) = next(iter(self._buckets.items()))
+            if full_after > now and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+rate_limit_store = MemoryRateLimitStore()
+# route name -> {"allowed": n, "limited": n}, reported on /api/health
+rate_limit_stats: Dict[str, Dict[str, int]] = {}
+
+
+def client_ip(request: Request) -> str:
+    if TRUSTED_PROXY_HOPS:
+        forwarded = [
+            entry.strip()
+            for header in request.headers.getlist('x-forwarded-for')
+            for entry in header.split(',')
+            if entry.strip()
+        ]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else 'unknown'
+
+
+class RateLimit:
+    """Dependency enforcing a "<requests>/<seconds>" token bucket per client IP."""
+
+    def __init__(self, name: str, limit: str, store=None):
+        requests, _, seconds = limit.partition('/')
+        self.name = name
+        self.capacity = float(requests)
+        self.refill_rate = self.capacity / float(seconds)
+        self.store = store
+        rate_limit_stats[name] = {"allowed": 0, "limited": 0}
+
+    async def __call__(self, request: Request):
+        store = self.store or rate_limit_store
+        retry_after = await store.take(f"{self.name}:{client_ip(request)}", self.capacity, self.refill_rate)
+        stats = rate_limit_stats[self.name]
+        if retry_after:
+            stats["limited"] += 1
+            logger.warning(f"Rate limited {self.name} for {client_ip(request)}")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        stats["allowed"] += 1
+
+
+contact_rate_limit = RateLimit("contact", CONTACT_RATE_LIMIT)
+admin_login_rate_limit = RateLimit("admin_login", ADMIN_LOGIN_RATE_LIMIT)
+
+
+# Email outbox
+def render_contact_email(contacts: List[dict]) -> dict:
+    """Build Resend params for one contact, or a digest of several."""
+    sections = []
+    for contact in contacts:
+        sections.append(f"""
+                <p><strong>Nombre:</strong> {html.escape(contact['name'])}</p>
+                <p><strong>Email:</strong> {html.escape(contact['email'])}</p>
+                <p><strong>Teléfono:</strong> {html.escape(contact.get('phone') or 'No proporcionado')}</p>
+                <hr style="border: 1px solid #ddd;">
+                <p><strong>Mensaje:</strong></p>
+                <p style="background: #f5f5f5; padding: 15px; border-radius: 5px;">{html.escape(contact['message'])}</p>
+                <hr style="border: 1px solid #ddd;">""")
+    if len(contacts) == 1:
+        title = "Nuevo Mensaje de Contacto - J.R Autos"
+        subject = f"Nuevo Contacto: {contacts[0]['name']}"
+    else:
+        title = f"{len(contacts)} Nuevos Mensajes de Contacto - J.R Autos"
+        subject = f"{len(contacts)} nuevos contactos"
+    html_content = f"""
+            <html>
+            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #333;">{title}</h2>
+                <hr style="border: 1px solid #ddd;">{''.join(sections)}
+                <p style="color: #666; font-size: 12px;">Este mensaje fue enviado desde el formulario de contacto de J.R Autos</p>
+            </body>
+            </html>
+            """
+    return {
+        "from": SENDER_EMAIL,
+        "to": [RECIPIENT_EMAIL],
+        "subject": subject,
+        "html": html_content
+    }
+
+
+class ResendEmailSender:
+    def __init__(self, api_key: str):
+        import resend
+        resend.api_key = api_key
+        self._resend = resend
+
+    async def send(self, params: dict):
+        # Run sync SDK in thread to keep FastAPI non-blocking
+        await asyncio.to_thread(self._resend.Emails.send, params)
+
+
+class FakeEmailSender:
+    """Records emails instead of sending them; fail_next makes sends raise."""
+
+    def __init__(self):
+        self.sent: List[dict] = []
+        self.fail_next = 0
+
+    async def send(self, params: dict):
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RuntimeError("Fake email failure")
+        self.sent.append(params)
+        logger.info(f"Fake email recorded: {params['subject']}")
+
+
+def make_email_sender():
+    if EMAIL_SENDER == 'fake':
+        return FakeEmailSender()
+    if EMAIL_SENDER == 'resend' and RESEND_API_KEY:
+        return ResendEmailSender(RESEND_API_KEY)
+    return None
+
+
+class EmailOutbox:
+    """Persistent queue of contact notifications, drained by a background task.
+
+    Entries are claimed atomically with a lease, so several workers (or a
+    restarted one) never send the same entry twice while a send is in flight.
+    """
+
+    def __init__(self, sender):
+        self.sender = sender
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, contact: dict):
+        now = datetime.now(timezone.utc)
+        await db.email_outbox.insert_one({
+            "id": str(uuid.uuid4()),
+            "contact": {k: contact[k] for k in ('id', 'name', 'email', 'phone', 'message')},
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self.sender is not None and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _due_filter(self, now: datetime) -> dict:
+        # "sending" entries whose lease expired belong to a crashed worker
+        return {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}}
+
+    async def _claim(self, limit: int) -> List[dict]:
+        entries = []
+        for _ in range(limit):
+            now = datetime.now(timezone.utc)
+            entry = await db.email_outbox.find_one_and_update(
+                self._due_filter(now),
+                {"$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=EMAIL_SEND_LEASE)},
+                 "$inc": {"attempts": 1}},
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if entry is None:
+                break
+            entries.append(entry)
+        return entries
+
+    async def drain(self):
+        """Send everything that is due; in digest mode, batch it into one email."""
+        if EMAIL_DIGEST_INTERVAL > 0:
+            now = datetime.now(timezone.utc)
+            due = self._due_filter(now)
+            oldest = await db.email_outbox.find_one(due, sort=[("created_at", ASCENDING)])
+            if oldest is None:
+                return
+            waited = (now - oldest['created_at']).total_seconds()
+            if waited < EMAIL_DIGEST_INTERVAL and await db.email_outbox.count_documents(due) < EMAIL_DIGEST_MAX:
+                return
+            if entries := await self._claim(EMAIL_DIGEST_MAX):
+                await self._deliver(entries)
+            return
+        while entries := await self._claim(EMAIL_CONCURRENCY):
+            await asyncio.gather(*(self._deliver([entry]) for entry in entries))
+
+    async def _deliver(self, entries: List[dict]):
+        ids = [entry['id'] for entry in entries]
+        try:
+            await self.sender.send(render_contact_email([entry['contact'] for entry in entries]))
+        except Exception as e:
+            logger.error(f"Failed to send email for {len(entries)} contact(s): {str(e)}")
+            now = datetime.now(timezone.utc)
+            for entry in entries:
+                if entry['attempts'] >= EMAIL_MAX_ATTEMPTS:
+                    update = {"status": "failed", "last_error": str(e)}
+                    email_contacts_total.inc("failed")
+                else:
+                    email_contacts_total.inc("retry")
+                    delay = min(EMAIL_RETRY_BASE * 2 ** (entry['attempts'] - 1), EMAIL_RETRY_MAX)
+                    update = {"status": "pending", "last_error": str(e),
+                              "next_attempt_at": now + timedelta(seconds=delay)}
+                await db.email_outbox.update_one({"id": entry['id']}, {"$set": update})
+            return
+        await db.email_outbox.update_many(
+            {"id": {"$in": ids}}, {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)}}
+        )
+        email_contacts_total.inc("sent", amount=len(entries))
+        logger.info(f"Email sent for {len(entries)} contact(s)")
+
+
+email_outbox = EmailOutbox(make_email_sender())
+
+
+# Live change feed
+class EventBroker:
+    """In-process fan-out of vehicle and contact changes to SSE subscribers.
+
+    Each event carries a public and an admin (event, data) pair; the public
+    side is None for events only admins may see. Event ids are
+    "<instance>-<seq>", so an id from another process or one older than
+    EVENTS_HISTORY is recognised and answered with a reset.
+    """
+
+    def __init__(self, history: int, queue_size: int):
+        self.instance = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.queue_size = queue_size
+        self.resets = 0
+        self.closed = False
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: set = set()
+        # Keys of changes published here, so the change stream echo is skipped
+        self._recent: OrderedDict = OrderedDict()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.instance}-{seq}"
+
+    def _reset_entry(self) -> tuple:
+        # Carries the latest id, so a client that resumes from it is current
+        reset = ("reset", "{}")
+        return (self.seq, reset, reset)
+
+    def seen(self, key) -> bool:
+        return key in self._recent
+
+    def remember(self, key) -> bool:
+        """Record a change made by this worker; False if it was already recorded."""
+        if key in self._recent:
+            return False
+        self._recent[key] = None
+        while len(self._recent) > self._history.maxlen:
+            self._recent.popitem(last=False)
+        return True
+
+    def publish(self, public: Optional[tuple], admin: tuple, key=None):
+        if key is not None and not self.remember(key):
+            return
+        self.seq += 1
+        entry = (self.seq, public, admin)
+        self._history.append(entry)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and have it refetch instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._reset_entry())
+                self.resets += 1
+
+    def subscribe(self, last_event_id: Optional[str]) -> tuple:
+        """Return (queue, backlog); backlog is the events after last_event_id."""
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        if not last_event_id:
+            return queue, []
+        instance, _, seq = last_event_id.partition('-')
+        oldest = self._history[0][0] if self._history else self.seq + 1
+        if instance != self.instance or not seq.isdigit() or not oldest - 1 <= int(seq) <= self.seq:
+            return queue, [self._reset_entry()]
+        return queue, [entry for entry in self._history if entry[0] > int(seq)]
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def close(self):
+        """End every subscriber's stream; their queues get a None sentinel."""
+        self.closed = True
+        for queue in self._subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+event_broker = EventBroker(EVENTS_HISTORY, EVENTS_QUEUE_SIZE)
+
+
+def publish_vehicle(vehicle: dict):
+    """Announce a created or updated vehicle; the public sees cards of available ones."""
+    vehicle_id = vehicle['id']
+    admin = ("vehicle.upsert", _dump_json(_vehicle_adapter, vehicle).decode())
+    if vehicle.get('available', True):
+        public = ("vehicle.upsert", _dump_json(_vehicle_adapter, vehicle, CARD_PROJECTION).decode())
+    else:
+        public = ("vehicle.delete", json.dumps({"id": vehicle_id}, separators=(",", ":")))
+    event_broker.publish(public, admin, key=("vehicle", vehicle_id, vehicle.get('version', 0)))
+
+
+def publish_vehicle_delete(vehicle_id: str, mongo_id=None):
+    event = ("vehicle.delete", json.dumps({"id": vehicle_id}, separators=(",", ":")))
+    event_broker.publish(event, event, key=("delete", str(mongo_id)) if mongo_id else None)
+
+
+def contact_event_key(contact: dict) -> tuple:
+    # status_updated_at is read back from MongoDB on both the handler and the
+    # change stream path, so it identifies one write; the status alone would
+    # drop a change back to an earlier status
+    return ("contact", contact['id'], contact.get('status', 'new'), contact.get('status_updated_at'))
+
+
+def publish_contact(contact: dict, event: str = "contact.create"):
+    admin = (event, ContactMessage.model_validate(contact).model_dump_json())
+    event_broker.publish(None, admin, key=contact_event_key(contact))
+
+
+def publish_reset():
+    event_broker.publish(("reset", "{}"), ("reset", "{}"))
+
+
+async def watch_changes():
+    """Follow MongoDB change streams into the inventory cache and the event broker.
+
+    Runs until cancelled. Without a replica set the server rejects the stream;
+    the handlers' local events are then all there is.
+    """
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": ["vehicles", "contact_messages"]},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document='updateLookup', resume_after=resume_token) as stream:
+                logger.info("Following MongoDB change streams for live events")
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    apply_change(change)
+        except OperationFailure as e:
+            logger.warning(f"MongoDB change streams unavailable, live events are per-process: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Change stream interrupted: {str(e)}")
+            await asyncio.sleep(5)
+
+
+class VehicleChangeBuffer:
+    """Vehicle changes from the change stream, applied after a quiet window.
+
+    A few changes are patched into the inventory snapshot and published one
+    by one. Patching re-sorts the snapshot, so a burst larger than
+    EVENTS_CHANGE_BURST is applied as one invalidate() and a reset instead.
+    """
+
+    def __init__(self, window: float, burst: int):
+        self.window = window
+        self.burst = burst
+        self._pending: dict = {}
+        self._overflow = False
+        self._received = 0
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"applied": 0, "coalesced": 0}
+
+    def add(self, vehicle: dict):
+        self._received += 1
+        if not self._overflow:
+            # Only the latest version of each vehicle matters
+            self._pending[vehicle['id']] = vehicle
+            if len(self._pending) > self.burst:
+                self._overflow = True
+                self._pending = {}
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            received = self._received
+            await asyncio.sleep(self.window)
+            if self._received == received:
+                break
+        self.flush()
+
+    def flush(self):
+        pending, overflow = list(self._pending.values()), self._overflow
+        self._pending, self._overflow = {}, False
+        if overflow:
+            self.stats["coalesced"] += 1
+            inventory_cache.invalidate()
+            publish_reset()
+            return
+        for vehicle in pending:
+            self.stats["applied"] += 1
+            inventory_cache.upsert(vehicle)
+            publish_vehicle(vehicle)
+
+
+vehicle_changes = VehicleChangeBuffer(EVENTS_CHANGE_WINDOW, EVENTS_CHANGE_BURST)
+
+
+def apply_change(change: dict):
+    collection = change["ns"]["coll"]
+    doc = change.get("fullDocument")
+    if change["operationType"] == "delete":
+        if collection == "vehicles" and not event_broker.seen(("delete", str(change["documentKey"]["_id"]))):
+            # Deletes only carry the Mongo _id, so other workers start over
+            inventory_cache.invalidate()
+            publish_reset()
+    elif doc is not None:
+        doc.pop('_id', None)
+        # Changes this worker made itself were applied and published already
+        if collection == "vehicles" and not event_broker.seen(("vehicle", doc['id'], doc.get('version', 0))):
+            vehicle_changes.add(doc)
+        elif collection == "contact_messages" and not event_broker.seen(contact_event_key(doc)):
+            publish_contact(doc, "contact.create" if change["operationType"] == "insert" else "contact.update")
+
+
+def format_event(entry: tuple, admin: bool) -> Optional[str]:
+    seq, public, admin_event = entry
+    event = admin_event if admin else public
+    if event is None:
+        return None
+    name, data = event
+    return f"id: {event_broker.event_id(seq)}\nevent: {name}\ndata: {data}\n\n"
+
+
+# Contact archival
+def contact_status_filter(statuses: List[str]) -> dict:
+    # Documents from before statuses existed have no field and count as new
+    values = [None, *statuses] if "new" in statuses else list(statuses)
+    return {"status": {"$in": values}}
+
+
+async def archive_contacts(now: Optional[datetime] = None) -> int:
+    """Move handled and expired messages to contact_messages_archive; returns how many.
+
+    Each batch is copied before it is deleted, and the archive's unique id
+    index makes a batch that was copied but not deleted safe to copy again.
+    """
+    now = now or datetime.now(timezone.utc)
+    query = {"$or": [
+        {"status": "replied", "status_updated_at": {"$lt": now - timedelta(days=CONTACT_ARCHIVE_REPLIED_DAYS)}},
+        {"created_at": {"$lt": now - timedelta(days=CONTACT_RETENTION_DAYS)}},
+    ]}
+    archived = 0
+    while True:
+        batch = await db.contact_messages.find(query, {"_id": 0}).limit(BULK_BATCH_SIZE).to_list(BULK_BATCH_SIZE)
+        if not batch:
+            break
+        try:
+            await db.contact_messages_archive.insert_many([{**doc, "archived_at": now} for doc in batch], ordered=False)
+        except BulkWriteError as e:
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+        await db.contact_messages.delete_many({"id": {"$in": [doc['id'] for doc in batch]}})
+        archived += len(batch)
+    if archived:
+        logger.info(f"Archived {archived} contact message(s)")
+    return archived
+
+
+class PeriodicJob:
+    """Runs a coroutine function every `interval` seconds until stopped.
+
+    With delay_first the first run waits one interval instead of happening
+    at startup.
+    """
+
+    def __init__(self, name: str, job, interval: float, delay_first: bool = False):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.delay_first = delay_first
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        if self.delay_first:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+contact_archiver = PeriodicJob("Contact archival", archive_contacts, CONTACT_ARCHIVE_INTERVAL)
+
+
+# Static site artifacts
+# Ids become file names, so anything else (e.g. from a bulk import) is skipped
+STATIC_ID_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write via a dotfile in the same directory, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def absolute_url(url: str) -> str:
+    return url if url.startswith(('http://', 'https://')) else f"{SITE_URL}{url}"
+
+
+def vehicle_seo_fragment(vehicle: dict) -> str:
+    """<head> markup for a vehicle page: OpenGraph tags and a schema.org Car."""
+    url = f"{SITE_URL}/vehicle/{vehicle['id']}"
+    title = f"{vehicle['name']} {vehicle['year']} | J.R Autos"
+    description = vehicle['description_es'][:200]
+    images = [absolute_url(image) for image in vehicle.get('images') or [] if image]
+    cover = vehicle.get('cover_image') or (images[0] if images else "")
+    structured = {
+        "@context": "https://schema.org",
+        "@type": "Car",
+        "name": vehicle['name'],
+        "url": url,
+        "description": vehicle['description_es'],
+        "brand": {"@type": "Brand", "name": vehicle['brand']},
+        "vehicleModelDate": vehicle['year'],
+        "bodyType": vehicle['bodyType'],
+        "fuelType": vehicle['fuel'],
+        "vehicleTransmission": vehicle['transmission'],
+        "vehicleEngine": {"@type": "EngineSpecification", "name": vehicle['engine']},
+        "itemCondition": "https://schema.org/UsedCondition",
+        "image": images,
+    }
+    tags = [
+        ("og:type", "product"),
+        ("og:title", title),
+        ("og:description", description),
+        ("og:url", url),
+        ("og:image", absolute_url(cover) if cover else ""),
+    ]
+    lines = [f'<meta property="{name}" content="{html.escape(value)}" />' for name, value in tags if value]
+    lines.append(f'<link rel="canonical" href="{html.escape(url)}" />')
+    # "</" would end the script element early
+    data = json.dumps(structured, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    lines.append(f'<script type="application/ld+json">{data}</script>')
+    return "\n".join(lines) + "\n"
+
+
+# Site-wide tags of the SPA shell that a vehicle fragment replaces
+SHELL_PAGE_TAGS_RE = re.compile(r'\s*<(?:link rel="canonical"|meta property="og:(?:type|title|description|url|image)")[^>]*>')
+
+
+def vehicle_page_html(shell: str, fragment: str) -> str:
+    """The SPA shell with a vehicle fragment at the end of <head>, replacing the site-wide tags."""
+    head_end = shell.find('</head>')
+    if head_end == -1:
+        return shell
+    return f"{SHELL_PAGE_TAGS_RE.sub('', shell[:head_end])}\n{fragment}{shell[head_end:]}"
+
+
+def sitemap_xml(vehicles: List[dict]) -> str:
+    entries = [(f"{SITE_URL}{page}", None) for page in SITE_PAGES]
+    entries += [(f"{SITE_URL}/vehicle/{v['id']}", v.get('updated_at')) for v in vehicles]
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for loc, lastmod in entries:
+        lastmod_tag = f"<lastmod>{lastmod.date().isoformat()}</lastmod>" if isinstance(lastmod, datetime) else ""
+        lines.append(f"  <url><loc>{html.escape(loc)}</loc>{lastmod_tag}</url>")
+    lines.append('</urlset>')
+    return "\n".join(lines) + "\n"
+
+
+def write_static_site(vehicles: List[dict], directory: Path):
+    """Write catalog.json, vehicles/<id>.html and sitemap.xml; drop fragments of removed vehicles."""
+    vehicles = [v for v in vehicles if STATIC_ID_RE.match(v['id'])]
+    fragments = directory / 'vehicles'
+    for vehicle in vehicles:
+        write_atomic(fragments / f"{vehicle['id']}.html", vehicle_seo_fragment(vehicle).encode())
+    current = {f"{v['id']}.html" for v in vehicles}
+    for path in fragments.glob('*.html'):
+        if path.name not in current:
+            path.unlink(missing_ok=True)
+    # Same bytes as GET /api/vehicles?view=card, minus the paging
+    write_atomic(directory / 'catalog.json', _dump_json(_vehicle_list_adapter, vehicles, CARD_PROJECTION))
+    write_atomic(directory / 'sitemap.xml', sitemap_xml(vehicles).encode())
+
+
+class StaticSiteBuilder:
+    """Debounced rebuild of the files served from /api/static.
+
+    schedule() is cheap and called after every inventory write; a burst of
+    writes within STATIC_BUILD_DELAY seconds results in a single build. The
+    build reads MongoDB rather than this worker's inventory snapshot, so
+    workers that rebuild after each other's writes all write the same files.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+        self.stats = {"builds": 0, "errors": 0, "vehicles": 0, "last_build_seconds": None}
+
+    def schedule(self):
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # A write that lands during a build schedules one more round
+        while self._pending:
+            await asyncio.sleep(self.delay)
+            self._pending = False
+            try:
+                await self.build()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Static site build failed: {str(e)}")
+
+    async def build(self):
+        start = time.perf_counter()
+        vehicles = await db.vehicles.find({"available": True}, {"_id": 0}).sort(
+            [("created_at", -1), ("id", -1)]
+        ).to_list(None)
+        await asyncio.to_thread(write_static_site, vehicles, STATIC_DIR)
+        self.stats["builds"] += 1
+        self.stats["vehicles"] = len(vehicles)
+        self.stats["last_build_seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Static site rebuilt: {len(vehicles)} vehicles")
+
+
+static_site = StaticSiteBuilder(STATIC_BUILD_DELAY)
+
+
+# Status heartbeats
+class StatusWriter:
+    """Write-behind buffer for /api/status pings.
+
+    Pings are inserted with insert_many in batches, and each stored batch is
+    folded into per-client, per-minute counters in status_rollups with one
+    bulk_write. Stored pings whose counters could not be written stay
+    pending and are retried on the next flush. Whatever is buffered is
+    flushed on shutdown.
+    """
+
+    def __init__(self):
+        self._buffer: List[dict] = []
+        # Stored pings not yet counted in status_rollups
+        self._unrolled: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.dropped = 0
+
+    async def add(self, doc: dict):
+        if self._task is None:
+            # No background writer (e.g. outside the app lifespan): write through
+            self._buffer.append(doc)
+            await self.flush()
+            return
+        if len(self._buffer) >= STATUS_MAX_BUFFER:
+            # The database has been failing for a while; shed the oldest pings
+            self._buffer.pop(0)
+            self.dropped += 1
+        self._buffer.append(doc)
+        if len(self._buffer) >= STATUS_FLUSH_SIZE:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=STATUS_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status writer error: {str(e)}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if self._unrolled:
+                await self._roll_up()
+            while self._buffer:
+                batch, self._buffer = self._buffer[:STATUS_FLUSH_SIZE], self._buffer[STATUS_FLUSH_SIZE:]
+                try:
+                    await db.status_checks.insert_many(batch, ordered=False)
+                except BulkWriteError as e:
+                    # Duplicate ids from a retried batch are already stored; other failures are not
+                    failed = {error['index'] for error in e.details.get('writeErrors', []) if error.get('code') != 11000}
+                    if failed:
+                        logger.error(f"Failed to store {len(failed)} status check(s): {str(e)}")
+                        batch = [doc for i, doc in enumerate(batch) if i not in failed]
+                except Exception:
+                    # Nothing was counted yet, so the batch can be retried as a whole
+                    self._buffer = batch + self._buffer
+                    raise
+                self._unrolled.extend(batch)
+                await self._roll_up()
+
+    async def _roll_up(self):
+        minutes: Dict[tuple, list] = {}
+        for doc in self._unrolled:
+            key = (doc['client_name'], doc['timestamp'].replace(second=0, microsecond=0))
+            entry = minutes.setdefault(key, [0, doc['timestamp'], doc['timestamp']])
+            entry[0] += 1
+            entry[1] = min(entry[1], doc['timestamp'])
+            entry[2] = max(entry[2], doc['timestamp'])
+        keys = list(minutes)
+        try:
+            await db.status_rollups.bulk_write([
+                UpdateOne(
+                    {"client_name": client_name, "minute": minute},
+                    {"$inc": {"count": count}, "$min": {"first_seen": first}, "$max": {"last_seen": last}},
+                    upsert=True,
+                )
+                for (client_name, minute), (count, first, last) in minutes.items()
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Only the failed counters are retried; the others were applied
+            failed = {keys[error['index']] for error in e.details.get('writeErrors', [])}
+            self._unrolled = [
+                doc for doc in self._unrolled
+                if (doc['client_name'], doc['timestamp'].replace(second=0, microsecond=0)) in failed
+            ]
+            raise
+        self._unrolled = []
+
+
+status_writer = StatusWriter()
+
+
+# Image processing
+def process_image(src_path: str, dest_dir: str, stem: str) -> dict:
+    """Decode an upload once and write a WebP file for each IMAGE_VARIANTS entry.
+
+    Runs in a worker process. EXIF orientation is applied to the pixels and all
+    metadata is dropped. Returns {variant: (filename, width)}.
+    """
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+    files = {}
+    # Largest first, so each variant is downscaled from the previous one
+    for name, width in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        if img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        filename = f"{stem}-{name}.webp"
+        tmp_path = Path(dest_dir) / f".{filename}.tmp"
+        img.save(tmp_path, 'WEBP', quality=IMAGE_QUALITY, method=4)
+        os.replace(tmp_path, Path(dest_dir) / filename)
+        files[name] = (filename, img.width)
+    return files
+
+
+def existing_image_variants(stem: str) -> Optional[dict]:
+    """Return process_image()-style results if every variant of stem is on disk.
+
+    Touches the files so the garbage collector treats them as freshly uploaded.
+    """
+    files = {}
+    for name in IMAGE_VARIANTS:
+        path = UPLOADS_DIR / f"{stem}-{name}.webp"
+        try:
+            with Image.open(path) as img:
+                files[name] = (path.name, img.width)
+            os.utime(path)
+        except (FileNotFoundError, UnidentifiedImageError):
+            return None
+    return files
+
+
+# Uploaded images: stored content-addressed as <sha256[:32]>-<variant>.webp.
+# Older uploads are single <uuid>.<ext> files; both are keyed for reference
+# counting by upload_key().
+UPLOAD_URL_RE = re.compile(r"/api/uploads/([^/?#]+)")
+
+
+def upload_key(filename: str) -> str:
+    """The stem shared by all variants of an upload, or the filename itself."""
+    stem, sep, rest = filename.rpartition('-')
+    if sep and rest.endswith('.webp') and rest[:-len('.webp')] in IMAGE_VARIANTS:
+        return stem
+    return filename
+
+
+def upload_files(key: str) -> List[Path]:
+    """Every file on disk belonging to an upload key."""
+    # Legacy keys are whole filenames (always with an extension); stems have no dot
+    if '.' in key:
+        return [UPLOADS_DIR / key]
+    return [UPLOADS_DIR / f"{key}-{name}.webp" for name in IMAGE_VARIANTS]
+
+
+def image_files(filename: str) -> List[Path]:
+    """Every file on disk belonging to the same upload as filename."""
+    return upload_files(upload_key(filename))
+
+
+def vehicle_upload_keys(vehicle: dict) -> set:
+    urls = list(vehicle.get('images') or []) + [vehicle.get('cover_image') or '']
+    return {upload_key(match.group(1)) for url in urls if (match := UPLOAD_URL_RE.search(url))}
+
+
+async def upload_ref_count(key: str) -> int:
+    """Number of vehicles whose images or cover_image point at this upload."""
+    suffix = '$' if '.' in key else '-'
+    pattern = {"$regex": f"/api/uploads/{re.escape(key)}{suffix}"}
+    return await db.vehicles.count_documents({"$or": [{"images": pattern}, {"cover_image": pattern}]})
+
+
+async def collect_orphaned_uploads(keys: set):
+    """Delete the files of uploads that no vehicle references any more."""
+    for key in keys:
+        try:
+            if await upload_ref_count(key):
+                continue
+            for path in upload_files(key):
+                if path.exists() and time.time() - path.stat().st_mtime > UPLOAD_GC_GRACE:
+                    path.unlink()
+                    logger.info(f"Removed orphaned upload: {path.name}")
+        except Exception as e:
+            logger.error(f"Failed to collect upload {key}: {str(e)}")
+
+
+def _unreferenced_candidates(referenced: set, now: float) -> set:
+    """Upload keys on disk, not in referenced, whose files are all past the grace period.
+
+    Temporary files older than the grace period are deleted on the way.
+    """
+    youngest: Dict[str, float] = {}
+    for path in UPLOADS_DIR.iterdir():
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        # Dotfiles are in-progress variant writes; old ones were abandoned
+        if path.name.startswith('.'):
+            if now - mtime > UPLOAD_GC_GRACE:
+                path.unlink(missing_ok=True)
+            continue
+        key = upload_key(path.name)
+        youngest[key] = max(youngest.get(key, 0), mtime)
+    # Left behind by a crashed upload
+    for path in UPLOADS_TMP_DIR.iterdir():
+        try:
+            if now - path.stat().st_mtime > UPLOAD_GC_GRACE:
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+    return {key for key, mtime in youngest.items() if key not in referenced and now - mtime > UPLOAD_GC_GRACE}
 
-# Resend configuration
-RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
-SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
-RECIPIENT_EMAIL = os.environ.get('RECIPIENT_EMAIL', 'alan.can85@gmail.com')
 
-# Admin password (hashed)
-ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'jrautos2024')
+async def sweep_uploads() -> int:
+    """Collect every upload no vehicle references; returns how many were candidates.
 
-# Create the main app without a prefix
-app = FastAPI()
+    Reads all vehicle image fields once; collect_orphaned_uploads() then
+    re-checks each candidate, so a vehicle saved meanwhile keeps its files.
+    """
+    referenced = set()
+    async for vehicle in db.vehicles.find({}, {"_id": 0, "images": 1, "cover_image": 1}).batch_size(BULK_BATCH_SIZE):
+        referenced |= vehicle_upload_keys(vehicle)
+    candidates = await asyncio.to_thread(_unreferenced_candidates, referenced, time.time())
+    await collect_orphaned_uploads(candidates)
+    return len(candidates)
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+upload_sweeper = PeriodicJob("Upload sweep", sweep_uploads, UPLOAD_SWEEP_INTERVAL, delay_first=True)
 
 
-# Define Models
-class StatusCheck(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+class UploadSizeLimitMiddleware:
+    """Rejects an oversized upload from its Content-Length before the multipart body is parsed.
 
-class StatusCheckCreate(BaseModel):
-    client_name: str
+    Plain ASGI, so every other request passes straight through untouched.
+    """
 
-class ContactMessage(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    email: EmailStr
-    phone: Optional[str] = None
-    message: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Room for the multipart framing around the file
+    MULTIPART_OVERHEAD = 64 * 1024
 
-class ContactMessageCreate(BaseModel):
-    name: str
-    email: EmailStr
-    phone: Optional[str] = None
-    message: str
+    def __init__(self, app):
+        self.app = app
 
-# Vehicle Models
-class VehicleImage(BaseModel):
-    url: str
-    order: int = 0
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/api/admin/upload":
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and \
+                        int(value) > MAX_UPLOAD_BYTES + self.MULTIPART_OVERHEAD:
+                    response = JSONResponse(status_code=413, content={"detail": "File too large"})
+                    return await response(scope, receive, send)
+        await self.app(scope, receive, send)
 
-class Vehicle(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    year: str
-    brand: str
-    bodyType: str
-    engine: str
-    fuel: str
-    transmission: str
-    description_es: str
-    description_en: str
-    images: List[str] = []
-    cover_image: str = ""
-    available: bool = True
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class VehicleCreate(BaseModel):
-    name: str
-    year: str
-    brand: str
-    bodyType: str
-    engine: str
-    fuel: str
-    transmission: str
-    description_es: str
-    description_en: str
-    images: List[str] = []
-    cover_image: str = ""
+async def stream_upload(file: UploadFile, dest: Path) -> tuple:
+    """Copy an upload to dest in UPLOAD_CHUNK_SIZE chunks, hashing as it goes.
 
-class VehicleUpdate(BaseModel):
-    name: Optional[str] = None
-    year: Optional[str] = None
-    brand: Optional[str] = None
-    bodyType: Optional[str] = None
-    engine: Optional[str] = None
-    fuel: Optional[str] = None
-    transmission: Optional[str] = None
-    description_es: Optional[str] = None
-    description_en: Optional[str] = None
-    images: Optional[List[str]] = None
-    cover_image: Optional[str] = None
-    available: Optional[bool] = None
+    Returns (size, sha256 hexdigest). Raises 413 as soon as MAX_UPLOAD_BYTES is
+    exceeded; dest is removed on any failure.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(dest, 'wb') as out_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
 
-class AdminLogin(BaseModel):
-    password: str
 
-class AdminToken(BaseModel):
-    token: str
-    message: str
+_image_pool: Optional[ProcessPoolExecutor] = None
 
 
-# Admin authentication
-def verify_admin_token(authorization: str = Header(None)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="No authorization header")
-    
+def get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        # Forking would copy this process mid-flight (Motor's and the loop's
+        # threads hold locks), so workers start from a clean forkserver
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _image_pool
+
+
+def _image_worker_ready() -> int:
+    # Defined here so each worker imports this module (and Pillow) while warming up
+    return os.getpid()
+
+
+async def warm_up_image_pool():
+    """Start every image worker now rather than on the first upload."""
+    loop = asyncio.get_running_loop()
     try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        # Simple token verification - token is hash of password
-        expected_token = hashlib.sha256(ADMIN_PASSWORD.encode()).hexdigest()
-        if token != expected_token:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        return True
+        await asyncio.gather(*(loop.run_in_executor(get_image_pool(), _image_worker_ready) for _ in range(IMAGE_WORKERS)))
+    except Exception as e:
+        logger.error(f"Image worker warm-up failed: {str(e)}")
+
+
+# Uploads serving
+HASHED_UPLOAD_RE = re.compile(r"^[0-9a-f]{32}-(" + "|".join(IMAGE_VARIANTS) + r")\.webp$")
+
+# Formats a legacy upload may have pre-encoded siblings in (base.avif, base.webp)
+NEGOTIABLE_UPLOAD_TYPES = ('.jpg', '.jpeg', '.png', '.gif')
+ALTERNATE_UPLOAD_FORMATS = (('image/avif', '.avif'), ('image/webp', '.webp'))
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+
+class UploadMemoryCache:
+    """LRU of small upload files (thumbnails mostly) bounded by total bytes."""
+
+    def __init__(self, max_bytes: int, max_file_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    async def get(self, path: Path, st: os.stat_result) -> Optional[bytes]:
+        if st.st_size > self.max_file_bytes:
+            return None
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+        data = await asyncio.to_thread(path.read_bytes)
+        if len(data) != st.st_size:
+            # Replaced while reading; serve it but don't cache under a stale key
+            return data
+        self._entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+        return data
+
+
+upload_memory_cache = UploadMemoryCache(UPLOADS_MEMORY_CACHE_BYTES, UPLOADS_MEMORY_CACHE_MAX_FILE)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single-range 'bytes=' header into inclusive (start, end).
+
+    Returns None to serve the whole file (no/unsupported/multi range) and raises
+    416 when the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if not sep:
+            return None
+        if not start:
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
     except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def iter_file_range(path: Path, start: int, end: int):
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def negotiate_upload(filename: str, accept: str) -> tuple:
+    """Pick the best on-disk encoding of filename for an Accept header.
+
+    Returns (path, vary) where vary says the choice depended on Accept.
+    """
+    path = UPLOADS_DIR / filename
+    if path.suffix.lower() not in NEGOTIABLE_UPLOAD_TYPES:
+        return path, False
+    for media_type, suffix in ALTERNATE_UPLOAD_FORMATS:
+        if media_type in accept:
+            alternate = path.with_suffix(suffix)
+            if alternate.is_file():
+                return alternate, True
+    return path, True
+
+
+def _not_modified(request: Request, etag: str, st: os.stat_result) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# Bulk import/export
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# Export flushes its buffer to the client roughly this often
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+async def iter_request_lines(request: Request):
+    """Yield the lines of a streamed UTF-8 request body as they arrive."""
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line.removesuffix('\r')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending.removesuffix('\r')
+
+
+async def iter_ndjson_rows(request: Request):
+    """Yield (line number, dict or error message) for an NDJSON body."""
+    row = 0
+    async for line in iter_request_lines(request):
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row, f"Invalid JSON: {str(e)}"
+            continue
+        yield row, data if isinstance(data, dict) else "Expected a JSON object"
+
+
+async def iter_csv_rows(request: Request):
+    """Yield (row number, dict or error message) for a CSV body with a header row.
+
+    images is a '|'-separated list and empty cells are treated as missing.
+    """
+    header = None
+    record = ''
+    row = 0
+    async for line in iter_request_lines(request):
+        record = f"{record}\n{line}" if record else line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        if not record.strip():
+            record = ''
+            continue
+        values = next(csv.reader([record]))
+        record = ''
+        if header is None:
+            header = values
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        data = {key: value for key, value in zip(header, values) if value != ''}
+        if 'images' in data:
+            data['images'] = [url for url in data['images'].split('|') if url]
+        yield row, data
+    if record:
+        yield row + 1, "Unterminated quoted field"
+
+
+class BulkImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, row: Optional[int], message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ROW_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "updated": self.updated, "failed": self.failed, "errors": self.errors}
+
+
+async def write_vehicle_batch(batch: List[tuple], upsert: bool, result: BulkImportResult):
+    """Write [(row, vehicle doc)] in one round-trip, recording per-row failures.
+
+    The rows are recorded as this worker's own changes first, so their
+    change stream echo is skipped; the import ends with a reset anyway.
+    """
+    if upsert:
+        ids = [doc['id'] for _, doc in batch]
+        versions = {v['id']: v.get('version', 0) async for v in db.vehicles.find(
+            {"id": {"$in": ids}}, {"_id": 0, "id": 1, "version": 1}
+        )}
+        for vehicle_id in ids:
+            event_broker.remember(("vehicle", vehicle_id, versions.get(vehicle_id, 0) + 1))
+        ops = []
+        for _, doc in batch:
+            fields = {k: v for k, v in doc.items() if k not in ('id', 'created_at', 'version')}
+            ops.append(UpdateOne(
+                {"id": doc['id']},
+                {"$set": fields, "$setOnInsert": {"created_at": doc['created_at']}, "$inc": {"version": 1}},
+                upsert=True,
+            ))
+    else:
+        for _, doc in batch:
+            event_broker.remember(("vehicle", doc['id'], doc['version']))
+    try:
+        if upsert:
+            outcome = await db.vehicles.bulk_write(ops, ordered=False)
+            result.inserted += outcome.upserted_count
+            result.updated += outcome.matched_count
+        else:
+            outcome = await db.vehicles.insert_many([doc for _, doc in batch], ordered=False)
+            result.inserted += len(outcome.inserted_ids)
+    except BulkWriteError as e:
+        details = e.details
+        result.inserted += details.get('nInserted', 0) + details.get('nUpserted', 0)
+        result.updated += details.get('nMatched', 0)
+        for write_error in details.get('writeErrors', []):
+            result.error(batch[write_error['index']][0], write_error.get('errmsg', 'Write failed'))
+
+
+async def iter_ndjson_export(cursor, model):
+    buffer = []
+    size = 0
+    async for doc in cursor:
+        line = model.model_validate(doc).model_dump_json() + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def iter_csv_export(cursor, model):
+    fields = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for doc in cursor:
+        data = model.model_validate(doc).model_dump(mode='json')
+        writer.writerow(['|'.join(data[f]) if isinstance(data[f], list) else data[f] for f in fields])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_response(cursor, model, format: str, name: str) -> StreamingResponse:
+    """Stream a Mongo cursor as NDJSON or CSV without materializing it."""
+    if format == 'csv':
+        body, media_type = iter_csv_export(cursor, model), 'text/csv; charset=utf-8'
+    else:
+        body, media_type = iter_ndjson_export(cursor, model), 'application/x-ndjson'
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{name}.{format}"'
+    })
 
 
 # Routes
@@ -161,7 +2729,34 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "J.R Autos API"}
+    return {
+        "status": "healthy",
+        "service": "J.R Autos API",
+        "indexes": index_state,
+        "rate_limits": {**rate_limit_stats, "tracked_clients": len(rate_limit_store)},
+        "inventory_cache": {**inventory_cache.stats, "version": inventory_cache.version},
+        "status_writer": {"buffered": len(status_writer._buffer), "unrolled": len(status_writer._unrolled),
+                          "dropped": status_writer.dropped},
+        "static_site": static_site.stats,
+        "events": {"subscribers": len(event_broker), "last_id": event_broker.event_id(event_broker.seq),
+                   "resets": event_broker.resets, "changes": vehicle_changes.stats},
+    }
+
+@api_router.get("/ready")
+async def readiness_check():
+    """Readiness probe: pings MongoDB and reports connection pool usage"""
+    start = time.perf_counter()
+    try:
+        await db.command('ping')
+    except Exception as e:
+        logger.error(f"Readiness ping failed: {str(e)}")
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e),
+                                                      "pool": mongo_pool_stats.snapshot()})
+    ping_ms = round((time.perf_counter() - start) * 1000, 2)
+    # Indexes could not be created if the database was down at startup
+    if len(index_state) < len(MONGO_INDEXES) or any(s["status"] != "ok" for s in index_state.values()):
+        await ensure_indexes()
+    return {"status": "ready", "ping_ms": ping_ms, "pool": mongo_pool_stats.snapshot()}
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
@@ -169,24 +2764,61 @@ async def create_status_check(input: StatusCheckCreate):
     status_obj = StatusCheck(**status_dict)
     
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     
-    _ = await db.status_checks.insert_one(doc)
+    # Buffered; written in batches by status_writer
+    await status_writer.add(doc)
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+STATUS_BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+
+@api_router.get("/status", response_model=List[StatusRollup])
+async def get_status_checks(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    client_name: Optional[str] = None,
+    bucket: str = "minute",
+):
+    """Ping counts per client and time bucket, read from the per-minute rollups.
+
+    Defaults to the last hour; from/to are ISO datetimes (UTC if no offset).
+    """
+    if bucket not in STATUS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket. Use one of: {', '.join(STATUS_BUCKETS)}")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=1)
+    start, end = (d if d.tzinfo else d.replace(tzinfo=timezone.utc) for d in (start, end))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if end - start > STATUS_MAX_RANGE:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {STATUS_MAX_RANGE.days} days")
     
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    query = {"minute": {"$gte": start.replace(second=0, microsecond=0), "$lt": end}}
+    if client_name:
+        query["client_name"] = client_name
+    rollups = await db.status_rollups.find(query, {"_id": 0}).sort(
+        [("minute", ASCENDING), ("client_name", ASCENDING)]
+    ).to_list(None)
     
-    return status_checks
+    # Minute rollups are summed into coarser buckets here rather than in MongoDB
+    seconds = STATUS_BUCKETS[bucket]
+    buckets: Dict[tuple, dict] = {}
+    for rollup in rollups:
+        ts = rollup['minute'].timestamp()
+        bucket_start = datetime.fromtimestamp(ts - ts % seconds, timezone.utc)
+        key = (rollup['client_name'], bucket_start)
+        entry = buckets.get(key)
+        if entry is None:
+            buckets[key] = {"client_name": rollup['client_name'], "start": bucket_start, "count": rollup['count'],
+                            "first_seen": rollup['first_seen'], "last_seen": rollup['last_seen']}
+        else:
+            entry["count"] += rollup['count']
+            entry["first_seen"] = min(entry["first_seen"], rollup['first_seen'])
+            entry["last_seen"] = max(entry["last_seen"], rollup['last_seen'])
+    return sorted(buckets.values(), key=lambda b: (b["start"], b["client_name"]))
 
 
 # Contact Form API
-@api_router.post("/contact", response_model=ContactMessage)
+@api_router.post("/contact", response_model=ContactMessage, dependencies=[Depends(contact_rate_limit)])
 async def submit_contact(input: ContactMessageCreate):
     """Submit a contact form message"""
     logger.info(f"Received contact form submission from: {input.name} ({input.email})")
@@ -195,7 +2827,6 @@ async def submit_contact(input: ContactMessageCreate):
     contact_obj = ContactMessage(**contact_dict)
     
     doc = contact_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     # Store in database
     try:
@@ -205,42 +2836,15 @@ async def submit_contact(input: ContactMessageCreate):
         logger.error(f"Failed to save contact message to database: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to save message to database")
     
-    # Try to send email if Resend is configured
-    if RESEND_API_KEY:
+    publish_contact(doc)
+    
+    # Notification is sent by the outbox worker, off the request path
+    if email_outbox.sender is not None:
         try:
-            import resend
-            resend.api_key = RESEND_API_KEY
-            
-            html_content = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #333;">Nuevo Mensaje de Contacto - J.R Autos</h2>
-                <hr style="border: 1px solid #ddd;">
-                <p><strong>Nombre:</strong> {input.name}</p>
-                <p><strong>Email:</strong> {input.email}</p>
-                <p><strong>Teléfono:</strong> {input.phone or 'No proporcionado'}</p>
-                <hr style="border: 1px solid #ddd;">
-                <p><strong>Mensaje:</strong></p>
-                <p style="background: #f5f5f5; padding: 15px; border-radius: 5px;">{input.message}</p>
-                <hr style="border: 1px solid #ddd;">
-                <p style="color: #666; font-size: 12px;">Este mensaje fue enviado desde el formulario de contacto de J.R Autos</p>
-            </body>
-            </html>
-            """
-            
-            params = {
-                "from": SENDER_EMAIL,
-                "to": [RECIPIENT_EMAIL],
-                "subject": f"Nuevo Contacto: {input.name}",
-                "html": html_content
-            }
-            
-            # Run sync SDK in thread to keep FastAPI non-blocking
-            await asyncio.to_thread(resend.Emails.send, params)
-            logger.info(f"Email sent successfully for contact from {input.email}")
+            await email_outbox.enqueue(doc)
         except Exception as e:
             # Log error but don't fail the request - message is still saved
-            logger.error(f"Failed to send email: {str(e)}")
+            logger.error(f"Failed to queue contact email: {str(e)}")
     else:
         logger.info("Resend not configured - contact message saved to database only")
     
@@ -248,70 +2852,139 @@ async def submit_contact(input: ContactMessageCreate):
 
 
 @api_router.get("/contact", response_model=List[ContactMessage])
-async def get_contact_messages():
-    """Get all contact messages (for admin use)"""
-    messages = await db.contact_messages.find({}, {"_id": 0}).to_list(1000)
-    
-    for msg in messages:
-        if isinstance(msg.get('created_at'), str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
-    
+async def get_contact_messages(
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Get contact messages, newest first (admin only; see /admin/contacts)"""
+    messages, next_cursor = await find_page(db.contact_messages, {}, "created_at", DESCENDING, limit, cursor)
+    response.headers.update(page_headers(next_cursor))
     return messages
 
 
 # ==================== PUBLIC VEHICLE API ====================
 
 @api_router.get("/vehicles", response_model=List[Vehicle])
-async def get_vehicles():
-    """Get all available vehicles (public)"""
-    vehicles = await db.vehicles.find({"available": True}, {"_id": 0}).sort("created_at", -1).to_list(100)
+async def get_vehicles(
+    request: Request,
+    query: VehicleQuery = Depends(vehicle_query),
+    projection: Optional[tuple] = Depends(vehicle_projection),
+):
+    """Get available vehicles, optionally filtered, sorted, paged and projected (public)"""
+    return cached_body_response(request, *await inventory_cache.list_body(query, projection))
+
+@api_router.get("/vehicles/search", response_model=VehicleSearchResult)
+async def search_vehicles(
+    q: str = "",
+    brand: Optional[str] = None,
+    bodyType: Optional[str] = None,
+    fuel: Optional[str] = None,
+    transmission: Optional[str] = None,
+    year: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    """Free-text search over available vehicles with facet counts (public)"""
+    filters = {"brand": brand, "bodyType": bodyType, "fuel": fuel, "transmission": transmission, "year": year}
+    total, results, facets = await inventory_cache.search_vehicles(q, filters, limit, offset)
+    return VehicleSearchResult(total=total, results=results, facets=facets)
+
+@api_router.get("/vehicles/events")
+async def vehicle_events(
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events stream of inventory changes (public).
+
+    Public subscribers get card-sized vehicle.upsert and vehicle.delete
+    events for available vehicles. With ?token= from POST
+    /api/admin/events-token (EventSource cannot send headers, and URLs end
+    up in access logs, so not the session token) every vehicle change and
+    contact events are sent too. A reset event means the client missed
+    changes and should refetch.
+    """
+    admin = False
+    if token:
+        if decode_admin_token(token, purpose="events") is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        admin = True
     
-    for vehicle in vehicles:
-        if isinstance(vehicle.get('created_at'), str):
-            vehicle['created_at'] = datetime.fromisoformat(vehicle['created_at'])
-        if isinstance(vehicle.get('updated_at'), str):
-            vehicle['updated_at'] = datetime.fromisoformat(vehicle['updated_at'])
+    async def stream():
+        queue, backlog = event_broker.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            for entry in backlog:
+                chunk = format_event(entry, admin)
+                if chunk:
+                    yield chunk
+            while not event_broker.closed:
+                try:
+                    entry = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if entry is None:
+                    # Shutting down; the client reconnects after the retry delay
+                    break
+                chunk = format_event(entry, admin)
+                if chunk:
+                    yield chunk
+        finally:
+            event_broker.unsubscribe(queue)
     
-    return vehicles
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @api_router.get("/vehicles/{vehicle_id}", response_model=Vehicle)
-async def get_vehicle(vehicle_id: str):
-    """Get a single vehicle by ID (public)"""
-    vehicle = await db.vehicles.find_one({"id": vehicle_id, "available": True}, {"_id": 0})
+async def get_vehicle(vehicle_id: str, request: Request, projection: Optional[tuple] = Depends(vehicle_projection)):
+    """Get a single vehicle by ID, optionally projected (public)"""
+    cached = await inventory_cache.get_body(vehicle_id, projection)
     
-    if not vehicle:
+    if not cached:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    if isinstance(vehicle.get('created_at'), str):
-        vehicle['created_at'] = datetime.fromisoformat(vehicle['created_at'])
-    if isinstance(vehicle.get('updated_at'), str):
-        vehicle['updated_at'] = datetime.fromisoformat(vehicle['updated_at'])
-    
-    return vehicle
+    return cached_body_response(request, *cached)
 
 
 # ==================== ADMIN API ====================
 
-@api_router.post("/admin/login", response_model=AdminToken)
+@api_router.post("/admin/login", response_model=AdminToken, dependencies=[Depends(admin_login_rate_limit)])
 async def admin_login(login: AdminLogin):
-    """Admin login - returns token if password matches"""
-    if login.password == ADMIN_PASSWORD:
-        token = hashlib.sha256(ADMIN_PASSWORD.encode()).hexdigest()
-        return AdminToken(token=token, message="Login successful")
+    """Admin login - returns a signed, expiring session token if password matches"""
+    if hmac.compare_digest(login.password.encode(), ADMIN_PASSWORD.encode()):
+        token, expires_at = issue_admin_token()
+        return AdminToken(token=token, message="Login successful", expires_at=expires_at)
     else:
         raise HTTPException(status_code=401, detail="Invalid password")
 
+@api_router.post("/admin/logout")
+async def admin_logout(claims: tuple = Depends(admin_token_claims)):
+    """Revoke the caller's admin session token"""
+    revoke_admin_token(*claims)
+    return {"message": "Logged out"}
+
+@api_router.post("/admin/events-token", response_model=AdminToken)
+async def admin_events_token(claims: tuple = Depends(admin_token_claims)):
+    """Short-lived token for /api/vehicles/events?token=, which EventSource puts in the URL"""
+    token, expires_at = issue_events_token(*claims)
+    return AdminToken(token=token, message="Events token issued", expires_at=expires_at)
+
 @api_router.get("/admin/vehicles", response_model=List[Vehicle])
-async def admin_get_vehicles(authorized: bool = Depends(verify_admin_token)):
+async def admin_get_vehicles(
+    response: Response,
+    query: VehicleQuery = Depends(vehicle_query),
+    available: Optional[bool] = None,
+    authorized: bool = Depends(verify_admin_token)
+):
     """Get all vehicles including unavailable (admin only)"""
-    vehicles = await db.vehicles.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    
-    for vehicle in vehicles:
-        if isinstance(vehicle.get('created_at'), str):
-            vehicle['created_at'] = datetime.fromisoformat(vehicle['created_at'])
-        if isinstance(vehicle.get('updated_at'), str):
-            vehicle['updated_at'] = datetime.fromisoformat(vehicle['updated_at'])
-    
+    mongo_filter = query.mongo_filter()
+    if available is not None:
+        mongo_filter['available'] = available
+    field, direction = VEHICLE_SORTS[query.sort]
+    vehicles, next_cursor = await find_page(db.vehicles, mongo_filter, field, direction, query.limit, query.cursor)
+    response.headers.update(page_headers(next_cursor))
     return vehicles
 
 @api_router.post("/admin/vehicles", response_model=Vehicle)
@@ -325,103 +2998,375 @@ async def admin_create_vehicle(vehicle_input: VehicleCreate, authorized: bool =
         vehicle_obj.cover_image = vehicle_obj.images[0]
     
     doc = vehicle_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
     
     await db.vehicles.insert_one(doc)
+    inventory_cache.upsert(vehicle_obj.model_dump())
+    publish_vehicle(vehicle_obj.model_dump())
+    static_site.schedule()
     logger.info(f"Vehicle created: {vehicle_obj.name} (ID: {vehicle_obj.id})")
     
     return vehicle_obj
 
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Version number from an If-Match header such as "3" or W/"3"."""
+    if not if_match or if_match.strip() == '*':
+        return None
+    try:
+        return int(if_match.strip().removeprefix('W/').strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+
 @api_router.put("/admin/vehicles/{vehicle_id}", response_model=Vehicle)
-async def admin_update_vehicle(vehicle_id: str, vehicle_update: VehicleUpdate, authorized: bool = Depends(verify_admin_token)):
+async def admin_update_vehicle(
+    vehicle_id: str,
+    vehicle_update: VehicleUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    authorized: bool = Depends(verify_admin_token)
+):
     """Update a vehicle (admin only)"""
-    # Get existing vehicle
-    existing = await db.vehicles.find_one({"id": vehicle_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    
     # Update only provided fields
     update_data = {k: v for k, v in vehicle_update.model_dump().items() if v is not None}
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    expected_version = update_data.pop('version', None)
+    if expected_version is None:
+        expected_version = parse_if_match(if_match)
+    update_data['updated_at'] = utc_now()
     
-    await db.vehicles.update_one({"id": vehicle_id}, {"$set": update_data})
+    query = {"id": vehicle_id}
+    if expected_version is not None:
+        # Documents written before versioning have no field and count as version 0
+        query["version"] = {"$in": [expected_version, None]} if expected_version == 0 else expected_version
     
-    # Return updated vehicle
-    updated = await db.vehicles.find_one({"id": vehicle_id}, {"_id": 0})
+    # One atomic round-trip; the pre-image is kept for upload garbage collection
+    existing = await db.vehicles.find_one_and_update(
+        query,
+        {"$set": update_data, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not existing:
+        if expected_version is not None and await db.vehicles.count_documents({"id": vehicle_id}, limit=1):
+            raise HTTPException(status_code=409, detail="Vehicle was modified by someone else")
+        raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    if isinstance(updated.get('updated_at'), str):
-        updated['updated_at'] = datetime.fromisoformat(updated['updated_at'])
+    updated = {**existing, **update_data, "version": existing.get('version', 0) + 1}
     
+    inventory_cache.upsert(updated)
+    publish_vehicle(updated)
+    static_site.schedule()
+    await collect_orphaned_uploads(vehicle_upload_keys(existing) - vehicle_upload_keys(updated))
     logger.info(f"Vehicle updated: {updated['name']} (ID: {vehicle_id})")
+    response.headers["ETag"] = f'"{updated["version"]}"'
     return updated
 
 @api_router.delete("/admin/vehicles/{vehicle_id}")
 async def admin_delete_vehicle(vehicle_id: str, authorized: bool = Depends(verify_admin_token)):
-    """Delete a vehicle (admin only)"""
-    result = await db.vehicles.delete_one({"id": vehicle_id})
+    """Delete a vehicle and any uploads only it used (admin only)"""
+    deleted = await db.vehicles.find_one_and_delete({"id": vehicle_id})
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
+    inventory_cache.remove(vehicle_id)
+    publish_vehicle_delete(vehicle_id, deleted.pop('_id', None))
+    static_site.schedule()
+    await collect_orphaned_uploads(vehicle_upload_keys(deleted))
     logger.info(f"Vehicle deleted: {vehicle_id}")
     return {"message": "Vehicle deleted successfully"}
 
-@api_router.get("/admin/contacts", response_model=List[ContactMessage])
-async def admin_get_contacts(authorized: bool = Depends(verify_admin_token)):
-    """Get all contact messages (admin only)"""
-    messages = await db.contact_messages.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+@api_router.post("/admin/vehicles/bulk")
+async def admin_bulk_import_vehicles(
+    request: Request,
+    mode: str = Query("insert", pattern="^(insert|upsert)$"),
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Import vehicles from a streamed NDJSON or CSV body (admin only)
+
+    mode=upsert matches rows on id and updates existing vehicles.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type == 'text/csv':
+        rows = iter_csv_rows(request)
+    elif content_type in NDJSON_MEDIA_TYPES:
+        rows = iter_ndjson_rows(request)
+    else:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson")
     
-    for msg in messages:
-        if isinstance(msg.get('created_at'), str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
+    upsert = mode == "upsert"
+    result = BulkImportResult()
+    batch = []
+    try:
+        async for row, data in rows:
+            if isinstance(data, str):
+                result.error(row, data)
+                continue
+            try:
+                vehicle = Vehicle(**data)
+            except ValidationError as e:
+                first = e.errors()[0]
+                result.error(row, f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}")
+                continue
+            # Set cover image to first image if not specified
+            if not vehicle.cover_image and vehicle.images:
+                vehicle.cover_image = vehicle.images[0]
+            batch.append((row, vehicle.model_dump()))
+            if len(batch) >= BULK_BATCH_SIZE:
+                await write_vehicle_batch(batch, upsert, result)
+                batch = []
+        if batch:
+            await write_vehicle_batch(batch, upsert, result)
+    except UnicodeDecodeError:
+        result.error(None, "Body is not valid UTF-8; import stopped")
+    finally:
+        if result.inserted or result.updated:
+            inventory_cache.invalidate()
+            publish_reset()
+            static_site.schedule()
     
+    logger.info(f"Bulk import: {result.inserted} inserted, {result.updated} updated, {result.failed} failed")
+    return result.as_dict()
+
+@api_router.get("/admin/vehicles/export")
+async def admin_export_vehicles(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Stream every vehicle as NDJSON or CSV (admin only)"""
+    cursor = db.vehicles.find({}, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).batch_size(BULK_BATCH_SIZE)
+    return export_response(cursor, Vehicle, format, "vehicles")
+
+def parse_contact_statuses(status: Optional[str]) -> List[str]:
+    statuses = [s.strip() for s in status.split(',') if s.strip()] if status else []
+    invalid = [s for s in statuses if s not in CONTACT_STATUSES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Use any of: {', '.join(CONTACT_STATUSES)}")
+    return statuses
+
+
+@api_router.get("/admin/contacts", response_model=List[ContactMessage])
+async def admin_get_contacts(
+    response: Response,
+    sort: str = Query("newest", pattern="^(newest|oldest)$"),
+    status: Optional[str] = None,
+    limit: int = Query(CONTACTS_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Get a page of active (not archived) contact messages, optionally by status=new,read,... (admin only)
+
+    Follow X-Next-Cursor for older pages.
+    """
+    statuses = parse_contact_statuses(status)
+    messages, next_cursor = await find_page(
+        db.contact_messages, contact_status_filter(statuses) if statuses else {},
+        "created_at", VEHICLE_SORTS[sort][1], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
     return messages
 
+@api_router.get("/admin/contacts/export")
+async def admin_export_contacts(
+    format: str = Query("csv", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    archived: bool = False,
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Stream contact messages as CSV or NDJSON; archived=true exports the archive (admin only)"""
+    statuses = parse_contact_statuses(status)
+    collection = db.contact_messages_archive if archived else db.contact_messages
+    cursor = collection.find(contact_status_filter(statuses) if statuses else {}, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).batch_size(BULK_BATCH_SIZE)
+    return export_response(cursor, ContactMessage, format, "contacts-archive" if archived else "contacts")
+
+@api_router.patch("/admin/contacts/{contact_id}", response_model=ContactMessage)
+async def admin_update_contact_status(
+    contact_id: str,
+    update: ContactStatusUpdate,
+    authorized: bool = Depends(verify_admin_token)
+):
+    """Mark a contact message new, read or replied (admin only)"""
+    contact = await db.contact_messages.find_one_and_update(
+        {"id": contact_id},
+        {"$set": {"status": update.status, "status_updated_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact message not found")
+    publish_contact(contact, "contact.update")
+    return contact
+
 
 @api_router.post("/admin/upload")
 async def admin_upload_image(
     file: UploadFile = File(...),
     authorized: bool = Depends(verify_admin_token)
 ):
-    """Upload an image file (admin only)"""
+    """Upload an image and store resized WebP variants of it (admin only)"""
     # Validate file type
     allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'image/gif']
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, WebP, and GIF are allowed.")
     
-    # Generate unique filename
-    file_ext = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-    unique_filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = UPLOADS_DIR / unique_filename
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
     
-    # Save file
+    tmp_path = UPLOADS_TMP_DIR / f"{uuid.uuid4()}.part"
+    size, sha256 = await stream_upload(file, tmp_path)
+    upload_bytes_total.inc(amount=size)
+    
+    # Same bytes -> same name, so a re-uploaded photo reuses the stored variants
+    stem = sha256[:32]
     try:
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
-        
-        # Return the URL path for the image
-        image_url = f"/api/uploads/{unique_filename}"
-        logger.info(f"Image uploaded: {unique_filename}")
-        return {"url": image_url, "filename": unique_filename}
+        files = await asyncio.to_thread(existing_image_variants, stem)
+        deduplicated = files is not None
+        if not deduplicated:
+            # Decode and re-encode in a worker process to keep the event loop free
+            loop = asyncio.get_running_loop()
+            files = await loop.run_in_executor(get_image_pool(), process_image, str(tmp_path), str(UPLOADS_DIR), stem)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f"Rejected image upload {file.filename}: {str(e)}")
+        raise HTTPException(status_code=400, detail="Could not read image file")
     except Exception as e:
         logger.error(f"Failed to upload image: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to upload image")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    
+    variants = {name: f"/api/uploads/{filename}" for name, (filename, _) in files.items()}
+    srcset = ", ".join(f"{variants[name]} {width}w" for name, (_, width) in files.items())
+    uploads_total.inc("deduplicated" if deduplicated else "processed")
+    logger.info(f"Image uploaded: {stem} ({size} bytes, {'deduplicated' if deduplicated else f'{len(files)} variants'})")
+    return {
+        "url": variants["full"],
+        "filename": files["full"][0],
+        "variants": variants,
+        "srcset": srcset,
+        "deduplicated": deduplicated,
+    }
+
+
+@api_router.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+async def serve_upload(filename: str, request: Request):
+    """Serve an uploaded image with caching, conditional and Range support (public)"""
+    # Dotfiles are in-progress variant writes
+    if filename.startswith('.'):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    path, vary = negotiate_upload(filename, request.headers.get('accept', ''))
+    try:
+        st = await asyncio.to_thread(path.stat)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": UPLOADS_IMMUTABLE_CACHE_CONTROL if HASHED_UPLOAD_RE.match(filename) else UPLOADS_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if vary:
+        headers["Vary"] = "Accept"
+    if _not_modified(request, etag, st):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    byte_range = None
+    if_range = request.headers.get('if-range')
+    if if_range is None or if_range == etag:
+        byte_range = parse_range(request.headers.get('range'), st.st_size)
+    
+    data = await upload_memory_cache.get(path, st)
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if data is not None:
+            return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+        return StreamingResponse(iter_file_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
+    if data is not None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    # Servers offering the ASGI pathsend extension send the file themselves
+    # (sendfile where the platform has it); uvicorn reads it in chunks
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=st)
+
+
+async def read_static_file(path: Path, st: os.stat_result) -> bytes:
+    body = await upload_memory_cache.get(path, st)
+    if body is None:
+        body = await asyncio.to_thread(path.read_bytes)
+    return body
+
+
+@api_router.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def serve_static(path: str, request: Request):
+    """Serve a prebuilt artifact: catalog.json, sitemap.xml or vehicles/<id>.html (public)
+
+    Reads only the disk, so these keep answering while MongoDB is slow or down.
+    """
+    # Dotfiles are in-progress atomic writes; empty parts would make the path absolute
+    parts = path.split('/')
+    if any(not part or part.startswith('.') for part in parts):
+        raise HTTPException(status_code=404, detail="Not Found")
+    file_path = STATIC_DIR.joinpath(*parts)
+    try:
+        st = await asyncio.to_thread(file_path.stat)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    body = await read_static_file(file_path, st)
+    media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+    return cached_body_response(request, body, etag, {"Last-Modified": formatdate(st.st_mtime, usegmt=True)},
+                                media_type=media_type, cache_control=STATIC_CACHE_CONTROL)
+
+
+@app.api_route("/vehicle/{vehicle_id}", methods=["GET", "HEAD"], include_in_schema=False)
+async def vehicle_page(vehicle_id: str, request: Request):
+    """The SPA page of a vehicle with its OpenGraph tags and JSON-LD in <head> (public)
+
+    The proxy routes /vehicle/ here; the app then boots as on any other page.
+    """
+    if not STATIC_ID_RE.match(vehicle_id):
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    fragment_path = STATIC_DIR / 'vehicles' / f"{vehicle_id}.html"
+    try:
+        fragment_st = await asyncio.to_thread(fragment_path.stat)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    try:
+        shell_st = await asyncio.to_thread(SPA_INDEX_HTML.stat)
+    except FileNotFoundError:
+        logger.error(f"SPA shell {SPA_INDEX_HTML} is missing; build the frontend or set SPA_INDEX_HTML")
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    etag = f'"{shell_st.st_size:x}-{shell_st.st_mtime_ns:x}-{fragment_st.st_size:x}-{fragment_st.st_mtime_ns:x}"'
+    shell = await read_static_file(SPA_INDEX_HTML, shell_st)
+    fragment = await read_static_file(fragment_path, fragment_st)
+    body = vehicle_page_html(shell.decode(), fragment.decode()).encode()
+    return cached_body_response(request, body, etag, media_type="text/html; charset=utf-8",
+                                cache_control=STATIC_CACHE_CONTROL)
 
 
 @api_router.delete("/admin/upload/{filename}")
 async def admin_delete_image(filename: str, authorized: bool = Depends(verify_admin_token)):
-    """Delete an uploaded image (admin only)"""
-    file_path = UPLOADS_DIR / filename
+    """Delete an uploaded image and all of its variants (admin only)"""
+    paths = [path for path in image_files(filename) if path.exists()]
     
-    if not file_path.exists():
+    if not paths:
         raise HTTPException(status_code=404, detail="Image not found")
     
+    if await upload_ref_count(upload_key(filename)):
+        raise HTTPException(status_code=409, detail="Image is still used by a vehicle")
+    
     try:
-        file_path.unlink()
+        for path in paths:
+            path.unlink()
         logger.info(f"Image deleted: {filename}")
         return {"message": "Image deleted successfully"}
     except Exception as e:
@@ -432,8 +3377,16 @@ async def admin_delete_image(filename: str, authorized: bool = Depends(verify_ad
 # Include the router in the main app
 app.include_router(api_router)
 
-# Serve uploaded files
-app.mount("/api/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Outside compression, so response sizes are recorded as sent
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint; outside /api so it is not routed publicly"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 app.add_middleware(
     CORSMiddleware,
@@ -441,8 +3394,24 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count", "Retry-After"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def warm_up():
+    """Open pooled connections, ensure indexes and load the inventory before serving.
+
+    A database that is down only gets logged here; /api/ready reports it.
+    """
+    start = time.perf_counter()
+    try:
+        # Concurrent pings make the driver open up to minPoolSize connections now
+        await asyncio.gather(*(db.command('ping') for _ in range(max(1, MONGO_MIN_POOL_SIZE))))
+    except Exception as e:
+        logger.error(f"MongoDB warm-up failed: {str(e)}")
+        return
+    await ensure_indexes()
+    try:
+        await inventory_cache.list()
+    except Exception as e:
+        logger.error(f"Inventory warm-up failed: {str(e)}")
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
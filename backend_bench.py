@@ -0,0 +1,222 @@
+"""Load test for the J.R Autos API, run in-process against a local Mongo stand-in.
+
+Starts ``server.app`` behind an httpx ASGI transport, seeds vehicles and
+contacts, then drives concurrent requests at each scenario and prints
+throughput and latency percentiles as JSON. By default MongoDB is replaced by
+mongomock-motor; pass --mongo-url to run against a real (e.g. local) mongod.
+
+    python backend_bench.py [--vehicles 200] [--requests 2000] [--concurrency 32]
+                            [--scenarios list,detail,contact,upload] [--output bench.json]
+
+Compare the JSON output of two commits to spot regressions.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / 'backend'))
+
+# Must be set before server is imported: record emails instead of sending them
+# and keep the per-IP limits from throttling the load generator
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'jrautos_bench')
+os.environ['EMAIL_SENDER'] = 'fake'
+os.environ['CONTACT_RATE_LIMIT'] = '1000000000/1'
+os.environ['ADMIN_LOGIN_RATE_LIMIT'] = '1000000000/1'
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import server  # noqa: E402
+
+BRANDS = ["Toyota", "Nissan", "Honda", "Hyundai", "Kia", "Ford", "Chevrolet", "Mazda"]
+BODY_TYPES = ["SUV", "Sedan", "Pickup", "Hatchback"]
+
+
+def use_database(mongo_url: str = None):
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient(tz_aware=True)
+    server.client = client
+    server.db = client[os.environ['DB_NAME']]
+
+
+def use_upload_dirs(base: Path):
+    server.UPLOADS_DIR = base / 'uploads'
+    server.UPLOADS_TMP_DIR = base / 'uploads_tmp'
+    server.STATIC_DIR = base / 'static'
+    server.UPLOADS_DIR.mkdir()
+    server.UPLOADS_TMP_DIR.mkdir()
+    server.STATIC_DIR.mkdir()
+
+
+async def seed(rng: random.Random, vehicles: int, contacts: int) -> list:
+    await server.db.vehicles.delete_many({})
+    await server.db.contact_messages.delete_many({})
+    docs = []
+    for i in range(vehicles):
+        brand = rng.choice(BRANDS)
+        docs.append(server.Vehicle(
+            name=f"{brand} Model {i}",
+            year=str(rng.randint(2005, 2024)),
+            brand=brand,
+            bodyType=rng.choice(BODY_TYPES),
+            engine=rng.choice(["4 Cilindros", "6 Cilindros", "V8"]),
+            fuel=rng.choice(["Gasolina", "Diesel", "Híbrido"]),
+            transmission=rng.choice(["Automático", "Manual"]),
+            description_es=f"Vehículo de prueba número {i}",
+            description_en=f"Benchmark vehicle number {i}",
+            images=[f"/api/uploads/{i:032x}-full.webp"],
+            cover_image=f"/api/uploads/{i:032x}-full.webp",
+            available=rng.random() > 0.1,
+        ).model_dump())
+    if docs:
+        await server.db.vehicles.insert_many(docs)
+    contact_docs = [
+        server.ContactMessage(name=f"Cliente {i}", email=f"cliente{i}@example.com", message="Hola").model_dump()
+        for i in range(contacts)
+    ]
+    if contact_docs:
+        await server.db.contact_messages.insert_many(contact_docs)
+    server.inventory_cache.invalidate()
+    # Only available vehicles are served publicly
+    return [doc['id'] for doc in docs if doc['available']]
+
+
+def make_image(rng: random.Random) -> bytes:
+    # Random noise, so every upload has new content and is not deduplicated
+    img = Image.frombytes('RGB', (800, 600), rng.randbytes(800 * 600 * 3))
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=85)
+    return out.getvalue()
+
+
+def scenarios(rng: random.Random, vehicle_ids: list, admin_headers: dict) -> dict:
+    """Scenario name -> coroutine function issuing one request with the client."""
+
+    async def vehicle_list(http):
+        params = rng.choice([{}, {"brand": rng.choice(BRANDS)}, {"bodyType": rng.choice(BODY_TYPES), "limit": 20}])
+        return await http.get("/api/vehicles", params=params)
+
+    async def vehicle_detail(http):
+        return await http.get(f"/api/vehicles/{rng.choice(vehicle_ids)}")
+
+    async def contact(http):
+        n = rng.randrange(1_000_000)
+        return await http.post("/api/contact", json={
+            "name": f"Cliente {n}", "email": f"cliente{n}@example.com", "phone": "555-0100", "message": "Me interesa",
+        })
+
+    async def upload(http):
+        files = {"file": ("photo.jpg", make_image(rng), "image/jpeg")}
+        return await http.post("/api/admin/upload", files=files, headers=admin_headers)
+
+    return {"list": vehicle_list, "detail": vehicle_detail, "contact": contact, "upload": upload}
+
+
+async def run_scenario(http, request, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await request(http)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def main(args) -> dict:
+    rng = random.Random(args.seed)
+    use_database(args.mongo_url)
+    with tempfile.TemporaryDirectory() as tmp:
+        use_upload_dirs(Path(tmp))
+        async with server.app.router.lifespan_context(server.app):
+            vehicle_ids = await seed(rng, args.vehicles, args.contacts)
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                login = await http.post("/api/admin/login", json={"password": server.ADMIN_PASSWORD})
+                admin_headers = {"Authorization": f"Bearer {login.json()['token']}"}
+                available = scenarios(rng, vehicle_ids, admin_headers)
+                results = {}
+                for name in args.scenarios:
+                    # Uploads are orders of magnitude slower; keep their run short
+                    total = max(1, args.requests // 20) if name == "upload" else args.requests
+                    # Unmeasured warm-up: fills caches and starts the image workers
+                    await run_scenario(http, available[name], min(total, args.concurrency), args.concurrency)
+                    results[name] = await run_scenario(http, available[name], total, args.concurrency)
+                    print(f"{name}: {results[name]['rps']} req/s, p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "mongo": "mongod" if args.mongo_url else "mongomock",
+        "params": {
+            "vehicles": args.vehicles,
+            "contacts": args.contacts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario (uploads run 1/20th)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenarios", type=lambda s: s.split(','), default=["list", "detail", "contact", "upload"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", help="Benchmark a real MongoDB instead of mongomock-motor")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - {"list", "detail", "contact", "upload"}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    report = json.dumps(asyncio.run(main(args)), indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
@@ -1,4 +1,7 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 const AdminContext = createContext();
 
@@ -23,11 +26,17 @@ export const AdminProvider = ({ children }) => {
     setIsAuthenticated(true);
   };
 
-  const logout = () => {
+  const logout = useCallback(() => {
+    if (token) {
+      // Revoke the session server-side; the local logout doesn't wait for it
+      axios
+        .post(`${BACKEND_URL}/api/admin/logout`, null, { headers: { Authorization: `Bearer ${token}` } })
+        .catch(() => {});
+    }
     localStorage.removeItem('admin_token');
     setToken(null);
     setIsAuthenticated(false);
-  };
+  }, [token]);
 
   return (
     <AdminContext.Provider value={{ isAuthenticated, token, login, logout, loading }}>
@@ -4,3 +4,15 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Uploads are stored as <id>-{thumb,card,detail,full}.webp; any one of them
+// is enough to build a srcset so the browser can pick the right width.
+const IMAGE_VARIANT_WIDTHS = { thumb: 320, card: 640, detail: 1280, full: 1920 };
+const IMAGE_VARIANT_RE = /-(thumb|card|detail|full)\.webp$/;
+
+export function imageSrcSet(url) {
+  if (!url || !IMAGE_VARIANT_RE.test(url)) return undefined;
+  return Object.entries(IMAGE_VARIANT_WIDTHS)
+    .map(([name, width]) => `${url.replace(IMAGE_VARIANT_RE, `-${name}.webp`)} ${width}w`)
+    .join(', ');
+}
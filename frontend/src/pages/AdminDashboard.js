@@ -11,6 +11,21 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
+const CONTACT_STATUSES = [
+  { value: 'new', label: 'Nuevo' },
+  { value: 'read', label: 'Leído' },
+  { value: 'replied', label: 'Respondido' },
+];
+
+// Replace the item with the same id, or add it to the top of the list
+const upsertById = (items, item) => {
+  const index = items.findIndex((existing) => existing.id === item.id);
+  if (index === -1) return [item, ...items];
+  const next = [...items];
+  next[index] = item;
+  return next;
+};
+
 // Image Uploader Component
 const ImageUploader = ({ images, setImages, token }) => {
   const [uploading, setUploading] = useState(false);
@@ -187,6 +202,8 @@ const AdminDashboard = () => {
   const navigate = useNavigate();
   const [vehicles, setVehicles] = useState([]);
   const [contacts, setContacts] = useState([]);
+  const [contactsCursor, setContactsCursor] = useState(null);
+  const [loadingMoreContacts, setLoadingMoreContacts] = useState(false);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('vehicles');
   const [showAddModal, setShowAddModal] = useState(false);
@@ -217,16 +234,20 @@ const AdminDashboard = () => {
     try {
       const [vehiclesRes, contactsRes] = await Promise.all([
         axios.get(`${BACKEND_URL}/api/admin/vehicles`, { headers }),
+        // Archived messages are left out; older pages load on demand
         axios.get(`${BACKEND_URL}/api/admin/contacts`, { headers }),
       ]);
       setVehicles(vehiclesRes.data);
       setContacts(contactsRes.data);
+      setContactsCursor(contactsRes.headers['x-next-cursor'] || null);
     } catch (err) {
       console.error('Error fetching data:', err);
+      // Session expired or was revoked
+      if (err.response?.status === 401) logout();
     } finally {
       setLoading(false);
     }
-  }, [token, headers]);
+  }, [token, headers, logout]);
 
   useEffect(() => {
     if (!authLoading && !isAuthenticated) {
@@ -238,6 +259,57 @@ const AdminDashboard = () => {
     if (token) fetchData();
   }, [token, fetchData]);
 
+  // Live changes from other admins and new contact messages, instead of polling
+  useEffect(() => {
+    if (!token) return undefined;
+    let source = null;
+    let retry = null;
+    let closed = false;
+    const connect = async (resync) => {
+      try {
+        // A short-lived stream token, so the session token stays out of URLs and access logs
+        const response = await axios.post(`${BACKEND_URL}/api/admin/events-token`, null, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (closed) return;
+        source = new EventSource(
+          `${BACKEND_URL}/api/vehicles/events?token=${encodeURIComponent(response.data.token)}`
+        );
+      } catch (err) {
+        console.error('Error opening live updates:', err);
+        return;
+      }
+      source.addEventListener('vehicle.upsert', (e) => {
+        const vehicle = JSON.parse(e.data);
+        setVehicles((current) => upsertById(current, vehicle));
+      });
+      source.addEventListener('vehicle.delete', (e) => {
+        const { id } = JSON.parse(e.data);
+        setVehicles((current) => current.filter((v) => v.id !== id));
+      });
+      const onContact = (e) => {
+        const contact = JSON.parse(e.data);
+        setContacts((current) => upsertById(current, contact));
+      };
+      source.addEventListener('contact.create', onContact);
+      source.addEventListener('contact.update', onContact);
+      // Changes were missed; start over from the full lists
+      source.addEventListener('reset', () => fetchData());
+      // A reconnect with an expired stream token is refused: get a new one and catch up
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retry = setTimeout(() => connect(true), 3000);
+        }
+      };
+      if (resync) fetchData();
+    };
+    connect(false);
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, [token, fetchData]);
 
   const handleLogout = () => {
     logout();
@@ -271,10 +343,10 @@ const AdminDashboard = () => {
         images: formImages,
         cover_image: formImages[0] || '',
       };
-      await axios.post(`${BACKEND_URL}/api/admin/vehicles`, payload, { headers });
+      const response = await axios.post(`${BACKEND_URL}/api/admin/vehicles`, payload, { headers });
+      setVehicles((current) => upsertById(current, response.data));
       setShowAddModal(false);
       resetForm();
-      fetchData();
     } catch (err) {
       console.error('Error adding vehicle:', err);
       alert('Error al agregar vehículo');
@@ -309,26 +381,33 @@ const AdminDashboard = () => {
         ...formData,
         images: formImages,
         cover_image: formImages[0] || '',
+        // Rejected with 409 if someone else saved this vehicle since it was loaded
+        version: editingVehicle.version,
       };
-      await axios.put(`${BACKEND_URL}/api/admin/vehicles/${editingVehicle.id}`, payload, { headers });
+      const response = await axios.put(`${BACKEND_URL}/api/admin/vehicles/${editingVehicle.id}`, payload, { headers });
+      setVehicles((current) => upsertById(current, response.data));
       setShowEditModal(false);
       setEditingVehicle(null);
       resetForm();
-      fetchData();
     } catch (err) {
       console.error('Error updating vehicle:', err);
-      alert('Error al actualizar vehículo');
+      if (err.response?.status === 409) {
+        alert('Este vehículo fue modificado por otra persona. Recarga y vuelve a intentarlo.');
+        fetchData();
+      } else {
+        alert('Error al actualizar vehículo');
+      }
     }
   };
 
   const handleToggleAvailability = async (vehicle) => {
     try {
-      await axios.put(
+      const response = await axios.put(
         `${BACKEND_URL}/api/admin/vehicles/${vehicle.id}`,
         { available: !vehicle.available },
         { headers }
       );
-      fetchData();
+      setVehicles((current) => upsertById(current, response.data));
     } catch (err) {
       console.error('Error toggling availability:', err);
     }
@@ -340,13 +419,66 @@ const AdminDashboard = () => {
     }
     try {
       await axios.delete(`${BACKEND_URL}/api/admin/vehicles/${vehicleId}`, { headers });
-      fetchData();
+      setVehicles((current) => current.filter((v) => v.id !== vehicleId));
     } catch (err) {
       console.error('Error deleting vehicle:', err);
       alert('Error al eliminar vehículo');
     }
   };
 
+  const handleLoadMoreContacts = async () => {
+    if (!contactsCursor) return;
+    setLoadingMoreContacts(true);
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/admin/contacts`, {
+        headers,
+        params: { cursor: contactsCursor },
+      });
+      // Older messages go last; skip any a live event already delivered
+      setContacts((current) => {
+        const seen = new Set(current.map((contact) => contact.id));
+        return [...current, ...response.data.filter((contact) => !seen.has(contact.id))];
+      });
+      setContactsCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      console.error('Error loading contacts:', err);
+    } finally {
+      setLoadingMoreContacts(false);
+    }
+  };
+
+  const handleContactStatus = async (contactId, status) => {
+    try {
+      const response = await axios.patch(
+        `${BACKEND_URL}/api/admin/contacts/${contactId}`,
+        { status },
+        { headers }
+      );
+      setContacts((current) => upsertById(current, response.data));
+    } catch (err) {
+      console.error('Error updating contact status:', err);
+    }
+  };
+
+  const handleExportContacts = async () => {
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/admin/contacts/export`, {
+        headers,
+        params: { format: 'csv' },
+        responseType: 'blob',
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = 'contactos.csv';
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error('Error exporting contacts:', err);
+      alert('Error al exportar mensajes');
+    }
+  };
+
   if (authLoading || loading) {
     return (
       <div className="min-h-screen bg-[#050505] flex items-center justify-center">
@@ -522,7 +654,17 @@ const AdminDashboard = () => {
 
         {activeTab === 'contacts' && (
           <>
-            <h2 className="text-xl font-semibold text-white mb-6">Mensajes de Contacto</h2>
+            <div className="flex justify-between items-center mb-6">
+              <h2 className="text-xl font-semibold text-white">Mensajes de Contacto</h2>
+              <Button
+                onClick={handleExportContacts}
+                variant="outline"
+                className="rounded-full border-white/20 bg-transparent text-white hover:bg-white/10"
+                size="sm"
+              >
+                Exportar CSV
+              </Button>
+            </div>
             
             <div className="space-y-4">
               {contacts.map((contact) => (
@@ -549,6 +691,21 @@ const AdminDashboard = () => {
                     </span>
                   </div>
                   <p className="text-gray-300 bg-white/5 p-4 rounded-lg">{contact.message}</p>
+                  <div className="flex gap-2 mt-4">
+                    {CONTACT_STATUSES.map(({ value, label }) => (
+                      <button
+                        key={value}
+                        onClick={() => handleContactStatus(contact.id, value)}
+                        className={`px-3 py-1 rounded-full text-xs transition-colors ${
+                          (contact.status || 'new') === value
+                            ? 'bg-white text-black'
+                            : 'bg-white/5 text-gray-400 hover:bg-white/10'
+                        }`}
+                      >
+                        {label}
+                      </button>
+                    ))}
+                  </div>
                 </div>
               ))}
 
@@ -558,6 +715,20 @@ const AdminDashboard = () => {
                   <p className="text-gray-400">No hay mensajes todavía</p>
                 </div>
               )}
+
+              {contactsCursor && (
+                <div className="text-center">
+                  <Button
+                    onClick={handleLoadMoreContacts}
+                    disabled={loadingMoreContacts}
+                    variant="outline"
+                    className="rounded-full border-white/20 bg-transparent text-white hover:bg-white/10"
+                    size="sm"
+                  >
+                    {loadingMoreContacts ? 'Cargando...' : 'Cargar más'}
+                  </Button>
+                </div>
+              )}
             </div>
           </>
         )}
@@ -27,7 +27,11 @@ const AdminLogin = () => {
       login(response.data.token);
       navigate('/admin/dashboard');
     } catch (err) {
-      setError('Contraseña incorrecta');
+      if (err.response?.status === 429) {
+        setError('Demasiados intentos. Intenta de nuevo más tarde.');
+      } else {
+        setError('Contraseña incorrecta');
+      }
     } finally {
       setLoading(false);
     }
@@ -1,10 +1,11 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Calendar, Fuel, Settings, Phone, ChevronDown, X } from 'lucide-react';
 import { useLanguage } from '../context/LanguageContext';
 import { Button } from '../components/ui/button';
 import SEO from '../components/SEO';
+import { imageSrcSet } from '../lib/utils';
 import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -75,36 +76,94 @@ const Inventory = () => {
   const [bodyTypeFilter, setBodyTypeFilter] = useState('');
   const [brandDropdownOpen, setBrandDropdownOpen] = useState(false);
   const [bodyTypeDropdownOpen, setBodyTypeDropdownOpen] = useState(false);
+  const [usingFallback, setUsingFallback] = useState(false);
+  // 'snapshot' once the prebuilt catalog is shown, 'live' once the API answered
+  const loadedFrom = useRef(null);
 
-  useEffect(() => {
-    fetchVehicles();
-  }, []);
-
-  const fetchVehicles = async () => {
+  const fetchVehicles = useCallback(async () => {
+    // Brand/body type filtering happens on the server; the grid only needs card fields
+    const params = { view: 'card' };
+    if (brandFilter) params.brand = brandFilter;
+    if (bodyTypeFilter) params.bodyType = bodyTypeFilter;
     try {
-      const response = await axios.get(`${BACKEND_URL}/api/vehicles`);
-      if (response.data && response.data.length > 0) {
+      const response = await axios.get(`${BACKEND_URL}/api/vehicles`, { params });
+      loadedFrom.current = 'live';
+      if (response.data && (response.data.length > 0 || brandFilter || bodyTypeFilter)) {
         setVehicles(response.data);
+        setUsingFallback(false);
       } else {
         // Use fallback if no vehicles in DB
         setVehicles(fallbackVehicles);
+        setUsingFallback(true);
       }
     } catch (err) {
       console.error('Error fetching vehicles:', err);
-      // Use fallback on error
-      setVehicles(fallbackVehicles);
+      // Keep the prebuilt catalog if it is already on screen, else use fallback
+      if (loadedFrom.current !== 'snapshot' || brandFilter || bodyTypeFilter) {
+        setVehicles(fallbackVehicles);
+        setUsingFallback(true);
+      }
     } finally {
       setLoading(false);
     }
-  };
+  }, [brandFilter, bodyTypeFilter]);
+
+  useEffect(() => {
+    fetchVehicles();
+  }, [fetchVehicles]);
+
+  // First paint comes from the prebuilt catalog, which never waits on the
+  // database; the live list replaces it as soon as it arrives
+  useEffect(() => {
+    axios.get(`${BACKEND_URL}/api/static/catalog.json`)
+      .then((response) => {
+        if (loadedFrom.current === null && response.data?.length) {
+          loadedFrom.current = 'snapshot';
+          setVehicles(response.data);
+          setLoading(false);
+        }
+      })
+      .catch(() => {});
+  }, []);
+
+  // Apply inventory changes as they happen instead of waiting for a reload
+  useEffect(() => {
+    const source = new EventSource(`${BACKEND_URL}/api/vehicles/events`);
+    const matchesFilters = (vehicle) =>
+      (!brandFilter || vehicle.brand === brandFilter) &&
+      (!bodyTypeFilter || vehicle.bodyType === bodyTypeFilter);
+    source.addEventListener('vehicle.upsert', (e) => {
+      if (usingFallback) {
+        fetchVehicles();
+        return;
+      }
+      const vehicle = JSON.parse(e.data);
+      setVehicles((current) => {
+        const rest = current.filter((v) => v.id !== vehicle.id);
+        if (!matchesFilters(vehicle)) return rest;
+        const index = current.findIndex((v) => v.id === vehicle.id);
+        if (index === -1) return [vehicle, ...rest];
+        const next = [...current];
+        next[index] = vehicle;
+        return next;
+      });
+    });
+    source.addEventListener('vehicle.delete', (e) => {
+      const { id } = JSON.parse(e.data);
+      setVehicles((current) => current.filter((v) => v.id !== id));
+    });
+    source.addEventListener('reset', () => fetchVehicles());
+    return () => source.close();
+  }, [fetchVehicles, brandFilter, bodyTypeFilter, usingFallback]);
 
   const filteredVehicles = useMemo(() => {
+    if (!usingFallback) return vehicles;
     return vehicles.filter(vehicle => {
       if (brandFilter && vehicle.brand !== brandFilter) return false;
       if (bodyTypeFilter && vehicle.bodyType !== bodyTypeFilter) return false;
       return true;
     });
-  }, [vehicles, brandFilter, bodyTypeFilter]);
+  }, [vehicles, usingFallback, brandFilter, bodyTypeFilter]);
 
   const fadeInUp = {
     initial: { opacity: 0, y: 30 },
@@ -286,6 +345,8 @@ const Inventory = () => {
                     <div className="relative aspect-[16/10] overflow-hidden">
                       <img
                         src={vehicle.cover_image || vehicle.images?.[0] || 'https://via.placeholder.com/400x300'}
+                        srcSet={imageSrcSet(vehicle.cover_image || vehicle.images?.[0])}
+                        sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                         alt={vehicle.name}
                         className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
                       />
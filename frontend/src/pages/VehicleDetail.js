@@ -5,6 +5,7 @@ import { Phone, ArrowLeft, Calendar, Fuel, Settings, ChevronLeft, ChevronRight }
 import { useLanguage } from '../context/LanguageContext';
 import { Button } from '../components/ui/button';
 import SEO from '../components/SEO';
+import { imageSrcSet } from '../lib/utils';
 import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -195,6 +196,8 @@ const VehicleDetail = () => {
             <div className="relative aspect-[4/3] rounded-2xl overflow-hidden bg-gray-900 mb-4">
               <img
                 src={vehicle.images[currentImageIndex]}
+                srcSet={imageSrcSet(vehicle.images[currentImageIndex])}
+                sizes="(min-width: 1024px) 50vw, 100vw"
                 alt={vehicle.name}
                 className="w-full h-full object-cover"
               />
@@ -238,7 +241,7 @@ const VehicleDetail = () => {
                         : 'border-transparent hover:border-white/50'
                     }`}
                   >
-                    <img src={img} alt="" className="w-full h-full object-cover" />
+                    <img src={img} srcSet={imageSrcSet(img)} sizes="80px" alt="" className="w-full h-full object-cover" />
                   </button>
                 ))}
               </div>
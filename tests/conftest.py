@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+# server reads these at import time; tests never reach a real database
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:1')
+os.environ.setdefault('DB_NAME', 'jrautos_test')
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh mongomock database behind server.db, with an empty inventory cache."""
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+    database = AsyncMongoMockClient(tz_aware=True)['jrautos_test']
+    monkeypatch.setattr(server, 'db', database)
+    monkeypatch.setattr(server, 'inventory_cache', server.InventoryCache(server.INVENTORY_CACHE_TTL))
+    return database
+
+
+@pytest.fixture
+def client(db):
+    """TestClient without the lifespan: no background tasks, nothing dials MongoDB."""
+    from fastapi.testclient import TestClient
+    import server
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def admin_headers():
+    import server
+    token, _ = server.issue_admin_token()
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def create_vehicle(client, admin_headers):
+    """Create a vehicle through the admin API; keyword arguments override the defaults."""
+    def create(**fields) -> dict:
+        data = dict(
+            name="Nissan Rogue", year="2016", brand="Nissan", bodyType="SUV", engine="4 Cilindros",
+            fuel="Gasolina", transmission="Automático", description_es="Camioneta económica",
+            description_en="Economic SUV", images=[], cover_image="",
+        )
+        response = client.post("/api/admin/vehicles", json={**data, **fields}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
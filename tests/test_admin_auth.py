@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_non_ascii_tokens_are_rejected_not_errors():
+    assert server.decode_admin_token("1.a.é") is None
+    assert server.decode_admin_token("é.é.é") is None
+    # No lifespan: these requests never reach the database
+    client = TestClient(server.app)
+    assert client.get("/api/admin/vehicles", headers={"Authorization": "Bearer 1.a.é".encode()}).status_code == 401
+    assert client.post("/api/admin/logout", headers={"Authorization": "Bearer é.é.é".encode()}).status_code == 401
+    assert client.get("/api/vehicles/events", params={"token": "é.é.é"}).status_code == 401
+
+
+def test_issued_token_round_trips():
+    token, expires = server.issue_admin_token()
+    assert server.decode_admin_token(token)[1] == expires.timestamp()
+    assert server.decode_admin_token(token[:-1] + ("A" if token[-1] != "A" else "B")) is None
+
+
+def test_events_token_is_short_lived_and_not_a_session_token(monkeypatch):
+    session, _ = server.issue_admin_token()
+    client = TestClient(server.app)
+    response = client.post("/api/admin/events-token", headers={"Authorization": f"Bearer {session}"})
+    assert response.status_code == 200
+    events_token = response.json()["token"]
+    token_id, expires = server.decode_admin_token(events_token, purpose="events")
+    assert token_id == server.decode_admin_token(session)[0]
+    assert expires <= server.time.time() + server.EVENTS_TOKEN_TTL
+    # Neither token works in place of the other
+    assert server.decode_admin_token(events_token) is None
+    assert client.get("/api/vehicles/events", params={"token": session}).status_code == 401
+    # Logging out revokes the stream tokens issued for the session
+    client.post("/api/admin/logout", headers={"Authorization": f"Bearer {session}"})
+    assert server.decode_admin_token(events_token, purpose="events") is None
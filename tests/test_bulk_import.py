@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+CSV_HEADER = "name,year,brand,bodyType,engine,fuel,transmission,description_es,description_en,images"
+
+
+def test_csv_with_a_byte_order_mark_imports_every_row(client, admin_headers):
+    body = (
+        f"﻿{CSV_HEADER}\n"
+        "Nissan Rogue,2016,Nissan,SUV,4 Cilindros,Gasolina,Automático,Camioneta,SUV,/a.webp|/b.webp\n"
+        "Toyota Hilux,2019,Toyota,Pickup,4 Cilindros,Diésel,Manual,Camioneta,Pickup,\n"
+    )
+    response = client.post(
+        "/api/admin/vehicles/bulk", content=body.encode('utf-8'),
+        headers={**admin_headers, "Content-Type": "text/csv"},
+    )
+    assert response.json() == {"inserted": 2, "updated": 0, "failed": 0, "errors": []}
+    vehicles = {v["name"]: v for v in client.get("/api/vehicles").json()}
+    assert sorted(vehicles) == ["Nissan Rogue", "Toyota Hilux"]
+    assert vehicles["Nissan Rogue"]["images"] == ["/a.webp", "/b.webp"]
+
+
+def vehicle_row(**fields) -> dict:
+    return {"name": "Nissan Rogue", "year": "2016", "brand": "Nissan", "bodyType": "SUV", "engine": "4 Cilindros",
+            "fuel": "Gasolina", "transmission": "Automático", "description_es": "Camioneta",
+            "description_en": "SUV", **fields}
+
+
+def post_ndjson(client, admin_headers, lines, mode="insert"):
+    body = "".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+    return client.post("/api/admin/vehicles/bulk", params={"mode": mode}, content=body.encode(),
+                       headers={**admin_headers, "Content-Type": "application/x-ndjson"}).json()
+
+
+def test_ndjson_import_reports_bad_rows_and_keeps_the_rest(client, admin_headers, db):
+    asyncio.run(db.vehicles.create_index("id", unique=True))
+    result = post_ndjson(client, admin_headers, [
+        json.dumps(vehicle_row(id="a")) + "\n",
+        "{not json\n",
+        "\n",
+        "[1, 2]\n",
+        json.dumps(vehicle_row(id="b", year=None)) + "\n",
+        json.dumps(vehicle_row(id="a", name="Duplicate")) + "\n",
+        json.dumps(vehicle_row(id="c", images=["/x.webp"])),
+    ])
+    assert (result["inserted"], result["updated"], result["failed"]) == (2, 0, 4)
+    errors = {error["row"]: error["error"] for error in result["errors"]}
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[4] == "Expected a JSON object"
+    assert errors[5].startswith("year:")
+    assert "E11000" in errors[6]
+    vehicles = {v["id"]: v for v in client.get("/api/vehicles").json()}
+    assert sorted(vehicles) == ["a", "c"]
+    assert vehicles["c"]["cover_image"] == "/x.webp"
+
+
+def test_upsert_updates_matching_ids(client, admin_headers):
+    post_ndjson(client, admin_headers, [json.dumps(vehicle_row(id="a")) + "\n"])
+    result = post_ndjson(client, admin_headers, [json.dumps(vehicle_row(id="a", year="2017")) + "\n",
+                                                 json.dumps(vehicle_row(id="b")) + "\n"], mode="upsert")
+    assert (result["inserted"], result["updated"], result["failed"]) == (1, 1, 0)
+    vehicles = {v["id"]: v for v in client.get("/api/vehicles").json()}
+    assert vehicles["a"]["year"] == "2017" and vehicles["a"]["version"] == 1
+    assert vehicles["b"]["version"] == 1
+
+
+def test_export_round_trips_through_import(client, admin_headers, create_vehicle):
+    create_vehicle(name='Rogue "SL"', description_es="Línea 1\nLínea 2, con coma", images=["/a.webp", "/b.webp"])
+    create_vehicle(name="Hilux")
+    for format, content_type in (("ndjson", "application/x-ndjson"), ("csv", "text/csv")):
+        exported = client.get("/api/admin/vehicles/export", params={"format": format}, headers=admin_headers)
+        assert exported.status_code == 200
+        result = client.post("/api/admin/vehicles/bulk", params={"mode": "upsert"}, content=exported.content,
+                             headers={**admin_headers, "Content-Type": content_type}).json()
+        assert (result["inserted"], result["updated"], result["failed"]) == (0, 2, 0), result
+    vehicles = {v["name"]: v for v in client.get("/api/vehicles").json()}
+    assert vehicles['Rogue "SL"']["description_es"] == "Línea 1\nLínea 2, con coma"
+    assert vehicles['Rogue "SL"']["images"] == ["/a.webp", "/b.webp"]
+
+
+def test_import_rejects_other_content_types(client, admin_headers):
+    response = client.post("/api/admin/vehicles/bulk", content=b"[]",
+                           headers={**admin_headers, "Content-Type": "application/json"})
+    assert response.status_code == 415
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_negotiate_encoding_prefers_brotli():
+    assert server.negotiate_encoding("gzip, deflate, br") == "br"
+    assert server.negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert server.negotiate_encoding("identity") is None
+
+
+def test_prebuilt_artifacts_are_served_brotli_compressed(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'STATIC_DIR', tmp_path)
+    body = b'{"vehicles": [' + b'{"name": "Nissan Rogue"},' * 200 + b'{}]}'
+    (tmp_path / 'catalog.json').write_bytes(body)
+    client = TestClient(server.app)
+    response = client.get("/api/static/catalog.json", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["etag"].endswith('-br"')
+    # httpx decodes br with the same brotli package
+    assert response.content == body
@@ -0,0 +1,42 @@
+import server
+
+
+def test_catalog_etags_follow_the_inventory(client, create_vehicle, admin_headers):
+    vehicle = create_vehicle(name="Car 1")
+    first = client.get("/api/vehicles")
+    etag = first.headers["etag"]
+    assert client.get("/api/vehicles", headers={"If-None-Match": etag}).status_code == 304
+    # Weak comparison, and one tag in a list
+    assert client.get("/api/vehicles", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    # Each projection is its own representation
+    card = client.get("/api/vehicles", params={"view": "card"}, headers={"If-None-Match": etag})
+    assert card.status_code == 200 and card.headers["etag"] != etag
+
+    client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1b"}, headers=admin_headers)
+    changed = client.get("/api/vehicles", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_compressed_and_identity_bodies_revalidate_each_other(client, create_vehicle):
+    for i in range(10):
+        create_vehicle(name=f"Car {i}", description_es="Camioneta económica " * 20)
+    identity = client.get("/api/vehicles", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/api/vehicles", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+    assert gzipped.content == identity.content
+    # A client holding either copy is current whatever it accepts now
+    for etag in (identity.headers["etag"], gzipped.headers["etag"]):
+        for accept in ("identity", "gzip", "br"):
+            response = client.get("/api/vehicles", headers={"If-None-Match": etag, "Accept-Encoding": accept})
+            assert response.status_code == 304
+
+
+def test_vehicle_detail_304(client, create_vehicle):
+    vehicle = create_vehicle()
+    response = client.get(f"/api/vehicles/{vehicle['id']}")
+    assert response.json()["id"] == vehicle["id"]
+    revalidated = client.get(f"/api/vehicles/{vehicle['id']}", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert server.inventory_cache.stats["body_hits"] >= 1
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import server
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def open_event_stream(port: int, deadline: float) -> socket.socket:
+    while True:
+        try:
+            conn = socket.create_connection(('127.0.0.1', port), timeout=1)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    conn.settimeout(max(1, deadline - time.monotonic()))
+    conn.sendall(b"GET /api/vehicles/events HTTP/1.1\r\nHost: test\r\nAccept: text/event-stream\r\n\r\n")
+    received = b""
+    while b"retry: 3000" not in received:
+        chunk = conn.recv(4096)
+        assert chunk, received
+        received += chunk
+    return conn
+
+
+def test_sigterm_shuts_down_with_open_event_stream():
+    port = free_port()
+    env = {**os.environ, 'MONGO_SERVER_SELECTION_TIMEOUT_MS': '200', 'MONGO_CONNECT_TIMEOUT_MS': '200'}
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(port), '--timeout-graceful-shutdown', '1'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        conn = open_event_stream(port, time.monotonic() + 30)
+        proc.send_signal(signal.SIGTERM)
+        output, _ = proc.communicate(timeout=10)
+        conn.close()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    assert proc.returncode == 0
+    assert "Application shutdown complete" in output
+
+
+def test_contact_status_changes_back_and_forth_are_all_published():
+    queue, _ = server.event_broker.subscribe(None)
+    try:
+        contact = {"id": "c1", "name": "Ana", "email": "ana@example.com", "message": "Hola",
+                   "created_at": datetime.now(timezone.utc)}
+        start = contact["created_at"]
+        for minute, status in enumerate(["new", "read", "new", "read", "replied"], start=1):
+            update = {**contact, "status": status, "status_updated_at": start + timedelta(minutes=minute)}
+            server.publish_contact(update, "contact.update")
+            # The change stream echo of the same write is skipped
+            assert server.event_broker.seen(server.contact_event_key(update))
+            server.publish_contact(dict(update), "contact.update")
+        statuses = []
+        while not queue.empty():
+            _, _, (_, data) = queue.get_nowait()
+            statuses.append(server.ContactMessage.model_validate_json(data).status)
+    finally:
+        server.event_broker.unsubscribe(queue)
+    assert statuses == ["new", "read", "new", "read", "replied"]
+
+
+def stream_change(vehicle: dict, operation: str = "update") -> dict:
+    return {"ns": {"coll": "vehicles"}, "operationType": operation, "fullDocument": {**vehicle, "_id": vehicle["id"]}}
+
+
+def drain(queue) -> list:
+    names = []
+    while not queue.empty():
+        _, _, (name, _) = queue.get_nowait()
+        names.append(name)
+    return names
+
+
+def test_change_stream_bursts_are_one_reset(monkeypatch):
+    monkeypatch.setattr(server, 'event_broker', server.EventBroker(100, 100))
+    monkeypatch.setattr(server, 'vehicle_changes', server.VehicleChangeBuffer(0.01, 3))
+    vehicle = server.Vehicle(name="Car", year="2020", brand="Nissan", bodyType="SUV", engine="V6", fuel="Gasolina",
+                             transmission="Manual", description_es="", description_en="").model_dump()
+
+    async def run() -> tuple:
+        queue, _ = server.event_broker.subscribe(None)
+        server.apply_change(stream_change(vehicle, "insert"))
+        await asyncio.sleep(0.1)
+        single = drain(queue)
+        # A bulk import on another worker
+        for version in range(1, 50):
+            server.apply_change(stream_change({**vehicle, "id": f"bulk-{version}", "version": version}))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        return single, drain(queue)
+
+    single, burst = asyncio.run(run())
+    assert single == ["vehicle.upsert"]
+    assert burst == ["reset"]
+
+
+def test_bulk_imported_rows_are_not_published_again(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(server, 'event_broker', server.EventBroker(100, 100))
+    rows = [
+        {"id": f"v{i}", "name": f"Car {i}", "year": "2020", "brand": "Nissan", "bodyType": "SUV", "engine": "V6",
+         "fuel": "Gasolina", "transmission": "Manual", "description_es": "", "description_en": ""}
+        for i in range(3)
+    ]
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    for mode in ("insert", "upsert"):
+        response = client.post("/api/admin/vehicles/bulk", params={"mode": mode}, content=body,
+                               headers={**admin_headers, "Content-Type": "application/x-ndjson"})
+        assert response.json()["failed"] == 0
+        for doc in asyncio.run(server.db.vehicles.find({}, {"_id": 0}).to_list(None)):
+            assert server.event_broker.seen(("vehicle", doc["id"], doc["version"]))
@@ -0,0 +1,45 @@
+import server
+
+
+def test_patched_snapshot_serves_the_same_etag_as_a_reload(client, create_vehicle, admin_headers):
+    client.get("/api/vehicles")
+    vehicle = create_vehicle(name="Car 1")
+    client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1b"}, headers=admin_headers)
+    patched = client.get("/api/vehicles")
+    detail = client.get(f"/api/vehicles/{vehicle['id']}")
+    # Another worker, or this one after the TTL, loads the same inventory from MongoDB
+    server.inventory_cache.invalidate()
+    reloaded = client.get("/api/vehicles")
+    assert patched.content == reloaded.content
+    assert patched.headers["etag"] == reloaded.headers["etag"]
+    assert detail.headers["etag"] == client.get(f"/api/vehicles/{vehicle['id']}").headers["etag"]
+    revalidated = client.get("/api/vehicles", headers={"If-None-Match": patched.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_body_cache_keeps_the_most_recently_used_pages(client, create_vehicle, monkeypatch):
+    monkeypatch.setattr(server, 'MAX_CACHED_BODIES', 2)
+    create_vehicle()
+    for brand in ("Nissan", "Toyota", "Ford", "Ford", "Toyota"):
+        client.get("/api/vehicles", params={"brand": brand})
+    # Ford replaced the least recently used page instead of going uncached
+    assert server.inventory_cache.stats["body_hits"] == 2
+    assert server.inventory_cache.stats["body_misses"] == 3
+
+
+def test_admin_writes_go_through_to_the_snapshot(client, create_vehicle, admin_headers):
+    assert client.get("/api/vehicles").json() == []
+    vehicle = create_vehicle(name="Car 1")
+    client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1b"}, headers=admin_headers)
+    assert [v["name"] for v in client.get("/api/vehicles").json()] == ["Car 1b"]
+    assert client.get(f"/api/vehicles/{vehicle['id']}").json()["name"] == "Car 1b"
+
+    client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"available": False}, headers=admin_headers)
+    assert client.get("/api/vehicles").json() == []
+    assert client.get(f"/api/vehicles/{vehicle['id']}").status_code == 404
+
+    other = create_vehicle(name="Car 2")
+    client.delete(f"/api/admin/vehicles/{other['id']}", headers=admin_headers)
+    assert client.get("/api/vehicles").json() == []
+    # Every read above was served from the one snapshot loaded first
+    assert server.inventory_cache.stats["reloads"] == 1
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import server
+
+
+class SlowVehicles:
+    """db.vehicles whose find() waits for release() and counts the queries."""
+
+    def __init__(self, vehicles):
+        self.vehicles = vehicles
+        self.queries = 0
+        self.fail = False
+        self.released = asyncio.Event()
+
+    def find(self, *args):
+        return self
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length):
+        self.queries += 1
+        await self.released.wait()
+        if self.fail:
+            raise ConnectionError("MongoDB is down")
+        return list(self.vehicles)
+
+
+def make_vehicle(name: str) -> dict:
+    return server.Vehicle(name=name, year="2020", brand="Nissan", bodyType="SUV", engine="V6", fuel="Gasolina",
+                          transmission="Manual", description_es="", description_en="").model_dump()
+
+
+def test_concurrent_cold_reads_share_one_query(monkeypatch):
+    async def run():
+        vehicles = SlowVehicles([make_vehicle("Car 1")])
+        monkeypatch.setattr(server, 'db', SimpleNamespace(vehicles=vehicles))
+        cache = server.InventoryCache(ttl=60)
+        readers = [asyncio.create_task(cache.list()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        # One reader disconnecting does not cancel the shared reload
+        readers[0].cancel()
+        vehicles.released.set()
+        results = await asyncio.gather(*readers[1:])
+        return vehicles.queries, cache.stats, results
+
+    queries, stats, results = asyncio.run(run())
+    assert queries == 1
+    assert (stats["misses"], stats["coalesced"], stats["reloads"]) == (1, 19, 1)
+    assert all([v["name"] for v in result] == ["Car 1"] for result in results)
+
+
+def test_stale_snapshot_is_served_while_one_refresh_runs(monkeypatch):
+    async def run():
+        vehicles = SlowVehicles([make_vehicle("Car 1")])
+        vehicles.released.set()
+        monkeypatch.setattr(server, 'db', SimpleNamespace(vehicles=vehicles))
+        cache = server.InventoryCache(ttl=60)
+        await cache.list()
+        cache._loaded_at -= 61
+        vehicles.released.clear()
+        vehicles.vehicles.append(make_vehicle("Car 2"))
+        # Past the TTL: answered at once from the old snapshot
+        stale = [len(await cache.list()) for _ in range(5)]
+        vehicles.released.set()
+        await asyncio.sleep(0.01)
+        return vehicles.queries, stale, len(await cache.list())
+
+    queries, stale, fresh = asyncio.run(run())
+    assert queries == 2
+    assert stale == [1] * 5
+    assert fresh == 2
+
+
+def test_failed_refresh_keeps_the_snapshot_and_a_cold_failure_raises(monkeypatch):
+    async def run():
+        vehicles = SlowVehicles([make_vehicle("Car 1")])
+        vehicles.released.set()
+        monkeypatch.setattr(server, 'db', SimpleNamespace(vehicles=vehicles))
+        cache = server.InventoryCache(ttl=60)
+        await cache.list()
+        cache._loaded_at -= 61
+        vehicles.fail = True
+        await cache.list()
+        await asyncio.sleep(0.01)
+        # Still served, and not retried on every request
+        served = await cache.list()
+        queries = vehicles.queries
+
+        cold = server.InventoryCache(ttl=60)
+        try:
+            await cold.list()
+        except ConnectionError:
+            cold_failed = True
+        else:
+            cold_failed = False
+        return served, queries, cache.stats["reload_errors"], cold_failed
+
+    served, queries, errors, cold_failed = asyncio.run(run())
+    assert [v["name"] for v in served] == ["Car 1"]
+    assert queries == 2 and errors == 1
+    assert cold_failed
+
+
+def test_write_during_reload_forces_another(monkeypatch):
+    async def run():
+        vehicles = SlowVehicles([make_vehicle("Car 1")])
+        monkeypatch.setattr(server, 'db', SimpleNamespace(vehicles=vehicles))
+        cache = server.InventoryCache(ttl=60)
+        reader = asyncio.create_task(cache.list())
+        await asyncio.sleep(0.01)
+        # The query may have read the database before this write
+        cache.remove("someone-else")
+        vehicles.released.set()
+        await reader
+        await cache.list()
+        return vehicles.queries
+
+    assert asyncio.run(run()) == 2
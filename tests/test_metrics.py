@@ -0,0 +1,25 @@
+import threading
+
+import server
+
+
+def test_render_while_other_threads_add_series():
+    counter = server.Counter("test_counter_total", "Test counter", ("key",))
+    histogram = server.Histogram("test_seconds", "Test histogram", ("key",))
+    server.METRICS.remove(counter)
+    server.METRICS.remove(histogram)
+
+    def record():
+        # Like MongoCommandMetrics callbacks on pymongo's threads
+        for i in range(20000):
+            counter.inc(i)
+            histogram.observe(0.01, i)
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    while thread.is_alive():
+        counter.render()
+        histogram.render()
+    thread.join()
+    assert len(counter.render()) == 2 + 20000
+    assert histogram.render()[-1] == 'test_seconds_count{key="19999"} 1'
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+
+def make_request(*forwarded_for: str, peer: str = '10.0.0.1') -> Request:
+    headers = [(b'x-forwarded-for', value.encode()) for value in forwarded_for]
+    return Request({'type': 'http', 'method': 'POST', 'path': '/', 'headers': headers, 'client': (peer, 1234)})
+
+
+@pytest.fixture
+def one_proxy(monkeypatch):
+    monkeypatch.setattr(server, 'TRUSTED_PROXY_HOPS', 1)
+
+
+def test_client_ip_ignores_peer_headers_without_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(server, 'TRUSTED_PROXY_HOPS', 0)
+    assert server.client_ip(make_request('1.2.3.4')) == '10.0.0.1'
+
+
+def test_client_ip_uses_entry_added_by_trusted_proxies(one_proxy, monkeypatch):
+    assert server.client_ip(make_request('6.6.6.6, 203.0.113.7')) == '203.0.113.7'
+    # Proxies may append a second header line instead of extending the first
+    assert server.client_ip(make_request('6.6.6.6', '203.0.113.7')) == '203.0.113.7'
+    monkeypatch.setattr(server, 'TRUSTED_PROXY_HOPS', 2)
+    assert server.client_ip(make_request('6.6.6.6, 203.0.113.7, 172.16.0.2')) == '203.0.113.7'
+    # Fewer entries than proxies: the request did not come through them
+    assert server.client_ip(make_request('203.0.113.7')) == '10.0.0.1'
+
+
+def test_spoofed_forwarded_for_shares_the_callers_bucket(one_proxy):
+    limit = server.RateLimit("test_spoof", "2/600", store=server.MemoryRateLimitStore())
+
+    async def attempt(spoofed: str):
+        await limit(make_request(f"{spoofed}, 203.0.113.7"))
+
+    asyncio.run(attempt('1.1.1.1'))
+    asyncio.run(attempt('2.2.2.2'))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(attempt('3.3.3.3'))
+    assert exc.value.status_code == 429
@@ -0,0 +1,57 @@
+import server
+
+
+def search(client, **params) -> dict:
+    response = client.get("/api/vehicles/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def names(result: dict) -> list:
+    return [v["name"] for v in result["results"]]
+
+
+def test_accent_insensitive_prefix_search_ranks_name_matches_first(client, create_vehicle):
+    create_vehicle(name="Nissan Frontier", brand="Nissan", bodyType="Pickup", description_es="Camión de trabajo")
+    create_vehicle(name="Toyota Hilux", brand="Toyota", bodyType="Pickup", description_es="Más fuerte que la Frontier")
+    create_vehicle(name="Nissan Rogue", brand="Nissan", description_es="Camioneta familiar")
+    assert names(search(client, q="CAMIÓN")) == ["Nissan Rogue", "Nissan Frontier"]
+    # The newer Hilux only mentions it in its description
+    assert names(search(client, q="frontier")) == ["Nissan Frontier", "Toyota Hilux"]
+    # Partial words match while typing; stopwords are ignored
+    assert names(search(client, q="fronti")) == ["Nissan Frontier", "Toyota Hilux"]
+    assert sorted(names(search(client, q="el nis"))) == ["Nissan Frontier", "Nissan Rogue"]
+    assert search(client, q="ferrari") == {
+        "total": 0, "results": [],
+        "facets": {"brand": {}, "bodyType": {}, "fuel": {}, "transmission": {}, "year": {}},
+    }
+
+
+def test_facets_ignore_their_own_filter(client, create_vehicle, admin_headers):
+    create_vehicle(name="Frontier", brand="Nissan", bodyType="Pickup")
+    create_vehicle(name="Rogue", brand="Nissan", bodyType="SUV")
+    create_vehicle(name="Hilux", brand="Toyota", bodyType="Pickup")
+    hidden = create_vehicle(name="Tacoma", brand="Toyota", bodyType="Pickup")
+    client.put(f"/api/admin/vehicles/{hidden['id']}", json={"available": False}, headers=admin_headers)
+
+    result = search(client, brand="Nissan")
+    assert result["total"] == 2
+    # Every brand stays selectable; body types are counted within Nissan
+    assert result["facets"]["brand"] == {"Nissan": 2, "Toyota": 1}
+    assert result["facets"]["bodyType"] == {"Pickup": 1, "SUV": 1}
+    result = search(client, brand="Nissan", bodyType="Pickup")
+    assert names(result) == ["Frontier"]
+    assert result["facets"]["bodyType"] == {"Pickup": 1, "SUV": 1}
+    assert result["facets"]["brand"] == {"Nissan": 1, "Toyota": 1}
+
+
+def test_search_pages_and_follows_writes(client, create_vehicle, admin_headers):
+    ids = [create_vehicle(name=f"Sentra {i}")["id"] for i in range(5)]
+    assert search(client, q="sentra", limit=2, offset=4)["total"] == 5
+    assert len(search(client, q="sentra", limit=2, offset=4)["results"]) == 1
+    client.put(f"/api/admin/vehicles/{ids[0]}", json={"name": "Versa"}, headers=admin_headers)
+    client.delete(f"/api/admin/vehicles/{ids[1]}", headers=admin_headers)
+    assert search(client, q="sentra")["total"] == 3
+    assert names(search(client, q="versa")) == ["Versa"]
+    # Served from the index of the snapshot loaded by the first search
+    assert server.inventory_cache.stats["reloads"] == 1
@@ -0,0 +1,42 @@
+import server
+
+SHELL = """<!doctype html>
+<html lang="es">
+    <head>
+        <title>J.R Autos</title>
+        <link rel="canonical" href="https://jrautos.com" />
+        <meta property="og:title" content="J.R Autos" />
+        <meta property="og:site_name" content="J.R Autos" />
+    </head>
+    <body><div id="root"></div><script src="/static/js/main.js"></script></body>
+</html>
+"""
+
+
+def test_vehicle_page_is_the_shell_with_the_vehicle_fragment(client, tmp_path, monkeypatch):
+    static_dir, shell = tmp_path / 'static', tmp_path / 'index.html'
+    shell.write_text(SHELL)
+    monkeypatch.setattr(server, 'STATIC_DIR', static_dir)
+    monkeypatch.setattr(server, 'SPA_INDEX_HTML', shell)
+    vehicle = server.Vehicle(
+        id="rogue-2016", name="Nissan Rogue", year="2016", brand="Nissan", bodyType="SUV", engine="4 Cilindros",
+        fuel="Gasolina", transmission="Automático", description_es="Camioneta económica",
+        description_en="Economic SUV", images=["/api/uploads/a.webp"],
+    ).model_dump()
+    server.write_static_site([vehicle], static_dir)
+
+    response = client.get("/vehicle/rogue-2016")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    page = response.text
+    head, body = page.split("</head>")
+    assert '<script type="application/ld+json">' in head
+    # The site-wide canonical and OpenGraph title give way to the vehicle's
+    assert head.count('rel="canonical"') == 1 and 'href="https://jrautos.com/vehicle/rogue-2016"' in head
+    assert head.count('property="og:title"') == 1 and "Nissan Rogue 2016" in head
+    assert 'property="og:site_name"' in head
+    assert '<script src="/static/js/main.js">' in body
+    revalidated = client.get("/vehicle/rogue-2016", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    assert client.get("/vehicle/unknown").status_code == 404
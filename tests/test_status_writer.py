@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+
+import server
+
+
+class FailOnce:
+    """Collection wrapper whose next call to `method` fails like a partial bulk write.
+
+    The documents or operations at the error's writeErrors indexes are
+    skipped, the rest are applied, then the BulkWriteError is raised.
+    """
+
+    def __init__(self, collection, method: str, error: Exception):
+        self._collection = collection
+        self._method = method
+        self._error = error
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name != self._method or self._error is None:
+            return attr
+
+        async def fail(items, *args, **kwargs):
+            error, self._error = self._error, None
+            failed = {e['index'] for e in error.details['writeErrors']}
+            await attr([item for i, item in enumerate(items) if i not in failed], *args, **kwargs)
+            raise error
+        return fail
+
+
+def pings(*clients: str) -> list:
+    timestamp = datetime(2026, 1, 1, 12, 0, 30, tzinfo=timezone.utc)
+    return [server.StatusCheck(client_name=name, timestamp=timestamp).model_dump() for name in clients]
+
+
+async def rollup_counts(db) -> dict:
+    return {doc['client_name']: doc['count'] async for doc in db.status_rollups.find({})}
+
+
+@pytest.fixture
+def mongo():
+    return AsyncMongoMockClient(tz_aware=True)['jrautos_test']
+
+
+def test_failed_rollup_is_retried_on_next_flush(mongo, monkeypatch):
+    db = SimpleNamespace(
+        status_checks=mongo.status_checks,
+        status_rollups=FailOnce(mongo.status_rollups, 'bulk_write', BulkWriteError(
+            {'writeErrors': [{'index': 0, 'code': 2, 'errmsg': 'failed'}]})),
+    )
+    monkeypatch.setattr(server, 'db', db)
+
+    async def run():
+        writer = server.StatusWriter()
+        writer._buffer = pings('a', 'a', 'b')
+        with pytest.raises(BulkWriteError):
+            await writer.flush()
+        assert len(writer._unrolled) == 2
+        await writer.flush()
+        return writer, await rollup_counts(mongo)
+
+    writer, counts = asyncio.run(run())
+    # "b" was applied by the failed call and is not counted twice
+    assert counts == {'a': 2, 'b': 1}
+    assert writer._unrolled == []
+
+
+def test_only_stored_pings_are_rolled_up(mongo, monkeypatch):
+    db = SimpleNamespace(
+        status_checks=FailOnce(mongo.status_checks, 'insert_many', BulkWriteError({'writeErrors': [
+            {'index': 1, 'code': 121, 'errmsg': 'Document failed validation'},
+            {'index': 2, 'code': 11000, 'errmsg': 'duplicate key'},
+        ]})),
+        status_rollups=mongo.status_rollups,
+    )
+    monkeypatch.setattr(server, 'db', db)
+
+    async def run():
+        writer = server.StatusWriter()
+        writer._buffer = pings('a', 'b', 'c')
+        await writer.flush()
+        return await rollup_counts(mongo)
+
+    assert asyncio.run(run()) == {'a': 1, 'c': 1}
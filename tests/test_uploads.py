@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+
+
+def touch(path, age: float):
+    path.write_bytes(b"x")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_sweep_collects_only_old_unreferenced_uploads(tmp_path, monkeypatch):
+    uploads, tmp = tmp_path / 'uploads', tmp_path / 'uploads_tmp'
+    uploads.mkdir()
+    tmp.mkdir()
+    monkeypatch.setattr(server, 'UPLOADS_DIR', uploads)
+    monkeypatch.setattr(server, 'UPLOADS_TMP_DIR', tmp)
+    db = AsyncMongoMockClient(tz_aware=True)['jrautos_test']
+    monkeypatch.setattr(server, 'db', db)
+
+    old = server.UPLOAD_GC_GRACE + 60
+    used, abandoned, fresh = 'a' * 32, 'b' * 32, 'c' * 32
+    for key in (used, abandoned):
+        for name in server.IMAGE_VARIANTS:
+            touch(uploads / f"{key}-{name}.webp", old)
+    touch(uploads / f"{fresh}-full.webp", 0)
+    touch(uploads / 'legacy.jpg', old)
+    touch(uploads / f".{abandoned}-full.webp.tmp", old)
+    touch(uploads / f".{fresh}-card.webp.tmp", 0)
+    touch(tmp / 'crashed', old)
+    touch(tmp / 'in-progress', 0)
+
+    async def run():
+        await db.vehicles.insert_one({"id": "v1", "images": [f"/api/uploads/{used}-full.webp"], "cover_image": ""})
+        return await server.sweep_uploads()
+
+    assert asyncio.run(run()) == 2
+    assert sorted(p.name for p in uploads.iterdir()) == sorted(
+        [f"{used}-{name}.webp" for name in server.IMAGE_VARIANTS]
+        + [f"{fresh}-full.webp", f".{fresh}-card.webp.tmp"]
+    )
+    assert [p.name for p in tmp.iterdir()] == ['in-progress']
+
+
+def test_oversized_upload_is_rejected_from_content_length(client, admin_headers):
+    headers = {**admin_headers, "Content-Length": str(server.MAX_UPLOAD_BYTES * 2),
+               "Content-Type": "multipart/form-data; boundary=x"}
+    response = client.post("/api/admin/upload", content=b"", headers=headers)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File too large"}
+
+
+def test_large_upload_is_handed_to_servers_offering_pathsend(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'UPLOADS_DIR', tmp_path)
+    name = f"{'d' * 32}-full.webp"
+    (tmp_path / name).write_bytes(b"x" * (server.UPLOADS_MEMORY_CACHE_MAX_FILE + 1))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"/api/uploads/{name}", "raw_path": f"/api/uploads/{name}".encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"test"), (b"accept-encoding", b"gzip, br")],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        "extensions": {"http.response.pathsend": {}},
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    # The whole middleware stack, as a server would call it
+    asyncio.run(server.app(scope, receive, send))
+    assert [m["type"] for m in messages] == ["http.response.start", "http.response.pathsend"]
+    assert messages[0]["status"] == 200
+    assert messages[1]["path"] == str(tmp_path / name)
@@ -0,0 +1,40 @@
+import asyncio
+
+
+def test_stale_version_is_rejected_with_409(client, create_vehicle, admin_headers):
+    vehicle = create_vehicle(name="Car 1")
+    assert vehicle["version"] == 0
+    first = client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1b", "version": 0},
+                       headers=admin_headers)
+    assert first.status_code == 200
+    assert first.json()["version"] == 1 and first.headers["etag"] == '"1"'
+    # A second editor still holding version 0
+    stale = client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1c", "version": 0},
+                       headers=admin_headers)
+    assert stale.status_code == 409
+    assert client.get(f"/api/vehicles/{vehicle['id']}").json()["name"] == "Car 1b"
+    # The version can come from If-Match instead of the body
+    stale = client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1c"},
+                       headers={**admin_headers, "If-Match": 'W/"0"'})
+    assert stale.status_code == 409
+    current = client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"name": "Car 1c"},
+                         headers={**admin_headers, "If-Match": first.headers["etag"]})
+    assert current.status_code == 200 and current.json()["version"] == 2
+
+
+def test_unversioned_updates_and_missing_vehicles(client, create_vehicle, admin_headers, db):
+    vehicle = create_vehicle()
+    # Stored before versioning existed: no version field counts as 0
+    asyncio.run(db.vehicles.update_one({"id": vehicle["id"]}, {"$unset": {"version": ""}}))
+    legacy = client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"year": "2017", "version": 0},
+                        headers=admin_headers)
+    assert legacy.status_code == 200 and legacy.json()["version"] == 1
+    # Without a version the last write wins
+    assert client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"year": "2018"},
+                      headers=admin_headers).json()["version"] == 2
+    assert client.put("/api/admin/vehicles/missing", json={"year": "2018", "version": 2},
+                      headers=admin_headers).status_code == 404
+    assert client.put(f"/api/admin/vehicles/{vehicle['id']}", json={"year": "2018"},
+                      headers={**admin_headers, "If-Match": "three"}).status_code == 400
+    stored = asyncio.run(db.vehicles.find_one({"id": vehicle["id"]}))
+    assert stored["year"] == "2018" and stored["version"] == 2